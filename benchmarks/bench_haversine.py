@@ -0,0 +1,36 @@
+import random
+import time
+import typing as tp
+
+import click
+from compgraph.graph import Graph
+from compgraph import operations as ops
+
+
+def generate_edges(count: int) -> tp.Generator[dict[str, tp.Any], None, None]:
+    rnd = random.Random(0)
+    for i in range(count):
+        start = [37 + rnd.random(), 55 + rnd.random()]
+        end = [start[0] + rnd.random() / 1000, start[1] + rnd.random() / 1000]
+        yield {'edge_id': i, 'start': start, 'end': end}
+
+
+@click.command()
+@click.option('--rows', default=1000000, help='Number of edges')
+@click.option('--batch-size', 'batch_sizes', multiple=True, type=int, default=(100, 1000, 10000),
+              help='Batch size to measure (may be passed several times)')
+def main(rows: int, batch_sizes: tuple[int, ...]) -> None:
+    edges = list(generate_edges(rows))
+    for batch_size in (None, *batch_sizes):
+        mapper = ops.Haversine('start', 'end', 'length')
+        graph = Graph.graph_from_iter('table').map(mapper, batch_size=batch_size)
+        start = time.perf_counter()
+        for _ in graph.run(table=lambda: iter(edges)):
+            pass
+        elapsed = time.perf_counter() - start
+        name = 'scalar' if batch_size is None else f'batch_size={batch_size}'
+        print(f'{name}: {rows / elapsed:.0f} rows/s ({elapsed:.2f} s)')
+
+
+if __name__ == "__main__":
+    main()
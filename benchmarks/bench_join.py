@@ -0,0 +1,45 @@
+import time
+import typing as tp
+
+import click
+from compgraph import operations as ops
+
+
+JOINERS: dict[str, tp.Callable[[], ops.Joiner]] = {
+    'inner': ops.InnerJoiner,
+    'outer': ops.OuterJoiner,
+    'left': ops.LeftJoiner,
+    'right': ops.RightJoiner,
+}
+
+
+def games(count: int) -> tp.Generator[dict[str, tp.Any], None, None]:
+    for i in range(count):
+        yield {'game_id': i, 'player_id': i // 4, 'score': i % 100}
+
+
+def players(count: int, collisions: bool) -> tp.Generator[dict[str, tp.Any], None, None]:
+    for i in range(count // 4):
+        if collisions:
+            yield {'player_id': i, 'username': f'player{i}', 'score': i}
+        else:
+            yield {'player_id': i, 'username': f'player{i}'}
+
+
+@click.command()
+@click.option('--rows', default=1000000, help='Number of rows in the left table')
+@click.option('--joiner', 'joiners', multiple=True, type=click.Choice(list(JOINERS)), default=list(JOINERS),
+              help='Joiner to measure (may be passed several times)')
+@click.option('--collisions/--no-collisions', default=True, help='Whether tables share a non-key column')
+def main(rows: int, joiners: tuple[str, ...], collisions: bool) -> None:
+    for name in joiners:
+        join = ops.Join(JOINERS[name](), ['player_id'])
+        start = time.perf_counter()
+        for _ in join(games(rows), players(rows, collisions)):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f'{name}: {rows / elapsed:.0f} rows/s ({elapsed:.2f} s)')
+
+
+if __name__ == "__main__":
+    main()
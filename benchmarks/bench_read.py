@@ -0,0 +1,34 @@
+import ast
+import os
+import tempfile
+import time
+
+import click
+from compgraph.graph import Graph
+
+
+@click.command()
+@click.option('--input', 'input_filepath', default='resources/road_graph_data.txt', help='Text file of rows')
+@click.option('--repeat', default=5, help='Number of copies of input')
+def main(input_filepath: str, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        text_filepath = os.path.join(directory, 'rows.txt')
+        with open(input_filepath) as source, open(text_filepath, 'w') as target:
+            lines = source.readlines()
+            for _ in range(repeat):
+                target.writelines(lines)
+        text_graph = Graph.graph_from_file(text_filepath, ast.literal_eval)
+        schema = list(next(iter(text_graph.run())))
+        for name, kwargs in (('binary', dict()), ('binary with schema', dict(schema=schema))):
+            binary_filepath = os.path.join(directory, 'rows.bin')
+            text_graph.run_to_binary_file(binary_filepath, **kwargs)
+            print(f'{name}: {os.path.getsize(binary_filepath)} bytes (text: {os.path.getsize(text_filepath)} bytes)')
+        for name, graph in (('text', text_graph), ('binary', Graph.graph_from_binary_file(binary_filepath))):
+            start = time.perf_counter()
+            count = sum(1 for _ in graph.run())
+            elapsed = time.perf_counter() - start
+            print(f'{name}: {count / elapsed:.0f} rows/s ({elapsed:.2f} s)')
+
+
+if __name__ == "__main__":
+    main()
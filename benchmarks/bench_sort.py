@@ -0,0 +1,30 @@
+import random
+import time
+import typing as tp
+
+import click
+from compgraph.graph import Graph
+
+
+def generate_rows(count: int) -> tp.Generator[dict[str, tp.Any], None, None]:
+    rnd = random.Random(0)
+    for i in range(count):
+        yield {'doc_id': i, 'text': str(rnd.randrange(count)), 'count': rnd.random()}
+
+
+@click.command()
+@click.option('--rows', default=1000000, help='Number of rows to sort')
+@click.option('--chunk-size', 'chunk_sizes', multiple=True, type=int, default=(1, 100, 1000, 10000, 100000),
+              help='Chunk size to measure (may be passed several times)')
+def main(rows: int, chunk_sizes: tuple[int, ...]) -> None:
+    for chunk_size in chunk_sizes:
+        graph = Graph.graph_from_iter('table').sort(['text'], chunk_size=chunk_size)
+        start = time.perf_counter()
+        for _ in graph.run(table=lambda: generate_rows(rows)):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f'chunk_size={chunk_size}: {rows / elapsed:.0f} rows/s ({elapsed:.2f} s)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import random
+import re
+import timeit
+import typing as tp
+
+import click
+from compgraph import operations as ops
+
+
+def old_split(row: dict[str, tp.Any]) -> tp.Generator[dict[str, tp.Any], None, None]:
+    """Split as it was before the pattern was compiled once"""
+    for match in re.finditer(r'(?:^|\s+)((?:(?!\s+).)*)', row['text']):
+        yield row.copy() | {'text': match.group(1)}
+
+
+def old_filter_punctuation(row: dict[str, tp.Any]) -> tp.Generator[dict[str, tp.Any], None, None]:
+    """FilterPunctuation as it was before the translation table was built once"""
+    row['text'] = str.translate(row['text'], str.maketrans('', '', r'!“”"‘’#$%&\'()*+,-./:;<=>?@[\]^_`{|}~'))
+    yield row
+
+
+def corpus(count: int) -> list[dict[str, tp.Any]]:
+    rnd = random.Random(0)
+    words = ['hello,', 'little', 'world!', 'HELLO', 'world...', 'a', 'b-c']
+    return [{'doc_id': i, 'text': ' '.join(rnd.choices(words, k=30))} for i in range(count)]
+
+
+def best_time(mapper: tp.Callable[[dict[str, tp.Any]], tp.Iterable[dict[str, tp.Any]]],
+              rows: list[dict[str, tp.Any]], repeat: int) -> float:
+    return min(timeit.repeat(lambda: [result for row in rows for result in mapper(row.copy())],
+                             number=1, repeat=repeat))
+
+
+@click.command()
+@click.option('--rows', default=5000, help='Number of documents')
+@click.option('--repeat', default=5, help='Number of measurements, the best one is reported')
+def main(rows: int, repeat: int) -> None:
+    documents = corpus(rows)
+    mappers: list[tuple[str, tp.Callable[[dict[str, tp.Any]], tp.Iterable[dict[str, tp.Any]]]]] = [
+        ('Split', ops.Split('text')),
+        ('Split (pattern per row)', old_split),
+        ('FilterPunctuation', ops.FilterPunctuation('text')),
+        ('FilterPunctuation (table per row)', old_filter_punctuation),
+    ]
+    for name, mapper in mappers:
+        elapsed = best_time(mapper, documents, repeat)
+        print(f'{name}: {rows / elapsed:.0f} rows/s ({elapsed:.3f} s)')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,55 @@
-import ast
+import functools
+from datetime import date, datetime
 from math import log, e
 from dateutil.parser import parse  # type: ignore
 import typing as tp
 from .graph import Graph
+from .parsers import TParser
 import compgraph.operations as ops
 
 
-def iter_or_file(filemod: bool, input_name: str, parser: tp.Callable[[str], ops.TRow]) -> Graph:
+def iter_or_file(filemod: bool, input_name: str, parser: TParser) -> Graph:
     if filemod:
         return Graph.graph_from_file(input_name, parser)
     else:
         return Graph.graph_from_iter(input_name)
 
 
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse timestamp of %Y%m%dT%H%M%S.%f layout (e.g. 20171020T112238.723000) by slicing the string;
+    timestamps of other layouts are parsed by dateutil
+    """
+    if len(value) == 22 and value[8] == 'T' and value[15] == '.':
+        try:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                            int(value[9:11]), int(value[11:13]), int(value[13:15]), int(value[16:22]))
+        except ValueError:
+            pass
+    return tp.cast(datetime, parse(value))
+
+
+@functools.lru_cache(maxsize=65536)
+def weekday_and_hour(day: date, hour: int) -> tuple[str, int]:
+    """Abbreviated weekday name and hour; cached, as timestamps of the same hour are frequent"""
+    return day.strftime('%a'), hour
+
+
 def word_count_graph(input_stream_name: str, text_column: str = 'text',
                      count_column: str = 'count',
-                     *, filemod: bool = False, parser: tp.Callable[[str], ops.TRow] = ast.literal_eval) -> Graph:
+                     *, filemod: bool = False, parser: TParser = 'auto') -> Graph:
     """Constructs graph which counts words in text_column of all rows passed"""
     return iter_or_file(filemod, input_stream_name, parser) \
         .map(ops.FilterPunctuation(text_column)) \
         .map(ops.LowerCase(text_column)) \
         .map(ops.Split(text_column)) \
-        .sort([text_column]) \
-        .reduce(ops.Count(count_column), [text_column]) \
+        .reduce(ops.Count(count_column), [text_column], presorted=False) \
         .sort([count_column, text_column])
 
 
 def inverted_index_graph(input_stream_name: str, doc_column: str = 'doc_id', text_column: str = 'text',
                          result_column: str = 'tf_idf',
-                         *, filemod: bool = False, parser: tp.Callable[[str], ops.TRow] = ast.literal_eval) -> Graph:
+                         *, filemod: bool = False, parser: TParser = 'auto') -> Graph:
     """Constructs graph which calculates td-idf for every word/document pair"""
     input_stream = iter_or_file(filemod, input_stream_name, parser)
     split_word = input_stream \
@@ -48,7 +69,7 @@ def inverted_index_graph(input_stream_name: str, doc_column: str = 'doc_id', tex
         .sort([text_column]) \
         .reduce(ops.Count('doc_count'), [text_column]) \
         .join(ops.InnerJoiner(), count_docs, []) \
-        .map(ops.LambdaMapper(idf)) \
+        .map(ops.LambdaMapper(idf, reads=['size', 'doc_count'], writes=['idf'])) \
         .sort([text_column])
 
     tf = split_word \
@@ -61,7 +82,7 @@ def inverted_index_graph(input_stream_name: str, doc_column: str = 'doc_id', tex
 
     return count_idf \
         .join(ops.InnerJoiner(), tf, [text_column]) \
-        .map(ops.LambdaMapper(tf_idf)) \
+        .map(ops.LambdaMapper(tf_idf, reads=['tf', 'idf'], writes=[result_column])) \
         .sort([text_column]) \
         .reduce(ops.TopN(result_column, 3), [text_column]) \
         .map(ops.Project([doc_column, text_column, result_column])) \
@@ -70,7 +91,7 @@ def inverted_index_graph(input_stream_name: str, doc_column: str = 'doc_id', tex
 
 def pmi_graph(input_stream_name: str, doc_column: str = 'doc_id', text_column: str = 'text',
               result_column: str = 'pmi',
-              *, filemod: bool = False, parser: tp.Callable[[str], ops.TRow] = ast.literal_eval) -> Graph:
+              *, filemod: bool = False, parser: TParser = 'auto') -> Graph:
     """Constructs graph which gives for every document the top 10 words ranked by pointwise mutual information"""
     suffix_a = '_1'
     suffix_b = '_2'
@@ -81,10 +102,11 @@ def pmi_graph(input_stream_name: str, doc_column: str = 'doc_id', text_column: s
         .map(ops.FilterPunctuation(text_column)) \
         .map(ops.LowerCase(text_column)) \
         .map(ops.Split(text_column)) \
-        .map(ops.Filter(lambda x: len(x[text_column]) > 4)) \
+        .map(ops.Filter(lambda x: len(x[text_column]) > 4, reads=[text_column])) \
+        .combine(ops.Count(count_column), [doc_column, text_column]) \
         .sort([doc_column, text_column]) \
-        .reduce(ops.Count(count_column), [doc_column, text_column]) \
-        .map(ops.Filter(lambda x: x[count_column] >= 2))
+        .reduce(ops.Count(count_column), [doc_column, text_column], combined=True) \
+        .map(ops.Filter(lambda x: x[count_column] >= 2, reads=[count_column]))
 
     word_count = split_word \
         .sort([text_column]) \
@@ -96,17 +118,18 @@ def pmi_graph(input_stream_name: str, doc_column: str = 'doc_id', text_column: s
         .sort([doc_column]) \
         .reduce(ops.Sum(count_column), [doc_column])
 
-    def freq(size_col: str, count_col: str) -> tp.Callable[[ops.TRow], tp.Iterable[ops.TRow]]:
-        return lambda row: [row | {frequency_column: row[count_col] / row[size_col]}]
+    def freq(size_col: str, count_col: str) -> ops.LambdaMapper:
+        return ops.LambdaMapper(lambda row: [row | {frequency_column: row[count_col] / row[size_col]}],
+                                reads=[size_col, count_col], writes=[frequency_column])
 
     in_all = all_words \
         .join(joiner, word_count, []) \
-        .map(ops.LambdaMapper(freq(count_column + suffix_a, count_column + suffix_b))) \
+        .map(freq(count_column + suffix_a, count_column + suffix_b)) \
         .sort([text_column])
 
     in_doc = words_in_doc \
         .join(ops.InnerJoiner(), split_word, [doc_column]) \
-        .map(ops.LambdaMapper(freq(count_column + suffix_a, count_column + suffix_b))) \
+        .map(freq(count_column + suffix_a, count_column + suffix_b)) \
         .sort([text_column])
 
     def ln(row: ops.TRow) -> ops.TRowsIterable:
@@ -114,8 +137,8 @@ def pmi_graph(input_stream_name: str, doc_column: str = 'doc_id', text_column: s
 
     res = in_all \
         .join(joiner, in_doc, [text_column]) \
-        .map(ops.LambdaMapper(freq(frequency_column + suffix_a, frequency_column + suffix_b))) \
-        .map(ops.LambdaMapper(ln)) \
+        .map(freq(frequency_column + suffix_a, frequency_column + suffix_b)) \
+        .map(ops.LambdaMapper(ln, reads=[frequency_column], writes=[result_column])) \
         .sort([doc_column]) \
         .reduce(ops.TopN(result_column, 10), [doc_column]) \
         .map(ops.Project([doc_column, result_column, text_column]))
@@ -127,8 +150,11 @@ def yandex_maps_graph(input_stream_name_time: str, input_stream_name_length: str
                       edge_id_column: str = 'edge_id', start_coord_column: str = 'start', end_coord_column: str = 'end',
                       weekday_result_column: str = 'weekday', hour_result_column: str = 'hour',
                       speed_result_column: str = 'speed',
-                      *, filemod: bool = False, parser: tp.Callable[[str], ops.TRow] = ast.literal_eval) -> Graph:
-    """Constructs graph which measures average speed in km/h depending on the weekday and hour"""
+                      *, filemod: bool = False, parser: TParser = 'auto',
+                      timestamp_parser: tp.Callable[[str], datetime] = parse_timestamp) -> Graph:
+    """Constructs graph which measures average speed in km/h depending on the weekday and hour
+    :param timestamp_parser: parser of enter and leave times, e.g. dateutil.parser.parse for arbitrary layouts
+    """
 
     delta_time_column = "delta"
     road_length_column = "length"
@@ -136,9 +162,9 @@ def yandex_maps_graph(input_stream_name_time: str, input_stream_name_length: str
     def time_delta(row: ops.TRow) -> ops.TRowsIterable:
         start = row[enter_time_column]
         end = row[leave_time_column]
-        dt_start = parse(start)
-        dt_end = parse(end)
-        start_parsed = dt_start.date().strftime('%a'), dt_start.time().hour
+        dt_start = timestamp_parser(start)
+        dt_end = timestamp_parser(end)
+        start_parsed = weekday_and_hour(dt_start.date(), dt_start.hour)
         delta_t = (dt_end - dt_start).total_seconds() / 3600
         return [row | {
             weekday_result_column: start_parsed[0],
@@ -147,12 +173,11 @@ def yandex_maps_graph(input_stream_name_time: str, input_stream_name_length: str
         }]
 
     time_input = iter_or_file(filemod, input_stream_name_time, parser) \
-        .map(ops.LambdaMapper(time_delta)) \
-        .sort([edge_id_column])
+        .map(ops.LambdaMapper(time_delta, reads=[enter_time_column, leave_time_column],
+                              writes=[weekday_result_column, hour_result_column, delta_time_column]))
 
     length_input = iter_or_file(filemod, input_stream_name_length, parser) \
-        .map(ops.Haversine(start_coord_column, end_coord_column, road_length_column)) \
-        .sort([edge_id_column])
+        .map(ops.Haversine(start_coord_column, end_coord_column, road_length_column), batch_size=1000)
 
     def mean_speed(row: ops.TRow) -> ops.TRowsIterable:
         dist = row[road_length_column]
@@ -160,8 +185,9 @@ def yandex_maps_graph(input_stream_name_time: str, input_stream_name_length: str
         return [row | {speed_result_column: dist / time}]
 
     return time_input \
-        .join(ops.InnerJoiner(), length_input, [edge_id_column]) \
-        .map(ops.LambdaMapper(mean_speed)) \
+        .hash_join(ops.InnerJoiner(), length_input, [edge_id_column]) \
+        .map(ops.LambdaMapper(mean_speed, reads=[road_length_column, delta_time_column],
+                              writes=[speed_result_column])) \
         .map(ops.Project([weekday_result_column, hour_result_column, speed_result_column])) \
         .sort([weekday_result_column, hour_result_column]) \
         .reduce(ops.Mean(speed_result_column, speed_result_column),
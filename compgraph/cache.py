@@ -0,0 +1,164 @@
+import functools
+import hashlib
+import os
+import re
+import types
+import typing as tp
+
+from . import operations as ops
+from . import plan
+from .external_sort import Presorted
+from .rowio import BinaryWriter
+
+FORMAT_VERSION = 1
+CACHED_KINDS = ('Sort', 'Reduce', 'Join')
+NOT_CACHED_OPERATIONS = (Presorted, ops.Combine)  # output is input as it is or partial aggregates
+HASHED_BYTES = 1024 * 1024
+REPR_TYPES = (range, slice, re.Pattern)  # values without __dict__ whose repr holds the whole state
+
+
+class Undescribable(ValueError):
+    """Value whose description can not cover its whole state"""
+
+
+def describe(value: tp.Any, seen: set[int] | None = None) -> str:
+    """
+    Stable description of value for fingerprints: operations, mappers and reducers are described by their type
+    and attributes, functions by their code, constants, default arguments, closure and global variables they use.
+    Values of a few types are described by repr (see REPR_TYPES)
+    :raises Undescribable: for other objects without __dict__ or with __slots__
+    """
+    seen = set() if seen is None else seen
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if id(value) in seen:
+        return '<cycle>'
+    seen = seen | {id(value)}
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__}[{", ".join(describe(item, seen) for item in value)}]'
+    if isinstance(value, (set, frozenset)):
+        return f'{type(value).__name__}{{{", ".join(sorted(describe(item, seen) for item in value))}}}'
+    if isinstance(value, dict):
+        items = sorted(f'{describe(key, seen)}: {describe(item, seen)}' for key, item in value.items())
+        return f'dict{{{", ".join(items)}}}'
+    if isinstance(value, type):
+        return f'class {value.__module__}.{value.__qualname__}'
+    if isinstance(value, types.ModuleType):
+        return f'module {value.__name__}'
+    if isinstance(value, types.CodeType):
+        consts = ', '.join(describe(const, seen) for const in value.co_consts)
+        return f'code {value.co_code.hex()} ({consts}) {value.co_names}'
+    if isinstance(value, types.FunctionType):
+        closure = [cell.cell_contents for cell in value.__closure__ or ()]
+        used_globals = {name: value.__globals__[name] for name in value.__code__.co_names
+                        if name in value.__globals__}
+        return f'function {value.__module__}.{value.__qualname__} {describe(value.__code__, seen)} ' \
+               f'{describe(value.__defaults__, seen)} {describe(closure, seen)} {describe(used_globals, seen)}'
+    if isinstance(value, types.MethodType):
+        return f'method {value.__func__.__qualname__} of {describe(value.__self__, seen)}'
+    if isinstance(value, (types.BuiltinFunctionType, types.MethodDescriptorType, types.WrapperDescriptorType)):
+        return f'builtin {getattr(value, "__module__", None)}.{value.__qualname__}'
+    if isinstance(value, functools.partial):
+        return f'partial of {describe(value.func, seen)} {describe(value.args, seen)} ' \
+               f'{describe(value.keywords, seen)}'
+    if hasattr(value, '__wrapped__'):
+        return f'wrapper of {describe(value.__wrapped__, seen)}'
+    if isinstance(value, REPR_TYPES):
+        return f'{type(value).__qualname__} {value!r}'
+    if not hasattr(value, '__dict__') or any(getattr(cls, '__slots__', ()) for cls in type(value).__mro__):
+        raise Undescribable(f'can not describe state of {type(value).__qualname__} object')
+    return f'{type(value).__module__}.{type(value).__qualname__}{describe(vars(value), seen)}'
+
+
+def file_fingerprint(filename: str) -> str:
+    """Fingerprint of file by its size, modification time and hash of its first and last megabytes"""
+    stat = os.stat(filename)
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        digest.update(f.read(HASHED_BYTES))
+        if stat.st_size > HASHED_BYTES:
+            f.seek(max(HASHED_BYTES, stat.st_size - HASHED_BYTES))
+            digest.update(f.read())
+    return f'{os.path.abspath(filename)} {stat.st_size} {stat.st_mtime_ns} {digest.hexdigest()}'
+
+
+def fingerprints(root: plan.Node) -> dict[int, str | None]:
+    """
+    Fingerprints of nodes of DAG: hash of description of operation, fingerprints of inputs and, for operations
+    reading files, fingerprints of files. Nodes reading rows passed to run or holding objects which can not be
+    described (and nodes depending on them) have None
+    """
+    result: dict[int, str | None] = dict()
+    for node in reversed(plan.topological_order(root)):
+        operation = node.operation
+        input_fingerprints = [result[id(input_node)] for input_node in node.inputs]
+        if isinstance(operation, ops.ReadIterFactory) or None in input_fingerprints:
+            result[id(node)] = None
+            continue
+        try:
+            description = describe(operation)
+        except Undescribable:
+            result[id(node)] = None
+            continue
+        parts = [str(FORMAT_VERSION), description, *tp.cast(list[str], input_fingerprints)]
+        filename = getattr(operation, 'filename', None)
+        if operation.kind == 'Read' and isinstance(filename, str):
+            parts.append(file_fingerprint(filename))
+        result[id(node)] = hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+    return result
+
+
+class Store(ops.Operation):
+    """Pass rows through and write them to file in binary row format; file appears only once rows are exhausted"""
+    kind = 'Cache'
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    def __call__(self, rows: ops.TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
+        temporary = f'{self.filename}.{os.getpid()}.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                writer = BinaryWriter(f)
+                for row in rows:
+                    writer.write(row)
+                    yield row
+                writer.flush()
+            os.replace(temporary, self.filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def apply(root: plan.Node, directory: str) -> plan.Node:
+    """
+    Rewrite DAG to reuse outputs of sorts, reduces, joins and of the whole graph stored in directory
+    by previous runs (the farthest from inputs wins, nodes it depends on are not executed) and to store
+    outputs not stored yet
+    :return: root of rewritten DAG
+    """
+    os.makedirs(directory, exist_ok=True)
+    node_fingerprints = fingerprints(root)
+    rewritten: dict[int, plan.Node] = dict()
+
+    def rewrite(node: plan.Node) -> plan.Node:
+        if id(node) in rewritten:
+            return rewritten[id(node)]
+        fingerprint = node_fingerprints[id(node)]
+        cached = node is root or (node.operation.kind in CACHED_KINDS
+                                  and not isinstance(node.operation, NOT_CACHED_OPERATIONS))
+        if fingerprint is None or not cached:
+            result = plan.Node(node.operation, [rewrite(input_node) for input_node in node.inputs])
+        else:
+            filename = os.path.join(directory, f'{fingerprint}.bin')
+            if os.path.exists(filename):
+                result = plan.Node(ops.ReadBinary(filename), [])
+            else:
+                computed = plan.Node(node.operation, [rewrite(input_node) for input_node in node.inputs])
+                result = plan.Node(Store(filename), [computed])
+        rewritten[id(node)] = result
+        return result
+
+    result = rewrite(root)
+    plan.count_consumers(result)
+    return result
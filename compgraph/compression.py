@@ -0,0 +1,133 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+import typing as tp
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment, unused-ignore]
+
+DEFAULT_READ_SIZE = 1024 * 1024
+DEFAULT_QUEUE_SIZE = 8
+
+
+def _open_zstd(filename: str, mode: str) -> tp.BinaryIO:
+    if zstandard is None:  # pragma: no cover
+        raise ValueError('zstandard has to be installed to read and write .zst files')
+    return tp.cast(tp.BinaryIO, zstandard.open(filename, mode))
+
+
+COMPRESSIONS: dict[str, tp.Callable[[str, str], tp.BinaryIO]] = {
+    'gzip': lambda filename, mode: tp.cast(tp.BinaryIO, gzip.open(filename, mode, compresslevel=6)),
+    'gzip-fast': lambda filename, mode: tp.cast(tp.BinaryIO, gzip.open(filename, mode, compresslevel=1)),
+    'bz2': lambda filename, mode: tp.cast(tp.BinaryIO, bz2.open(filename, mode)),
+    'xz': lambda filename, mode: tp.cast(tp.BinaryIO, lzma.open(filename, mode)),
+    'zstd': _open_zstd,
+}
+SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+
+def detect(filename: str, compression: str | None = 'auto') -> str | None:
+    """
+    Compression of file
+    :param compression: one of COMPRESSIONS, None for plain file, 'auto' to choose it by suffix of filename
+    """
+    if compression == 'auto':
+        return next((name for suffix, name in SUFFIXES.items() if filename.endswith(suffix)), None)
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f'unknown compression {compression!r}, known are {sorted(COMPRESSIONS)}')
+    return compression
+
+
+def open_binary(filename: str, mode: str = 'rb', compression: str | None = 'auto',
+                buffer_size: int = -1) -> tp.BinaryIO:
+    """
+    Open file for binary reading or writing, (de)compressing it on the fly
+    :param mode: 'rb' or 'wb'
+    :param compression: see detect
+    :param buffer_size: size of buffer of plain file in bytes (default if -1)
+    """
+    compression = detect(filename, compression)
+    if compression is None:
+        return tp.cast(tp.BinaryIO, open(filename, mode, buffering=buffer_size))
+    return COMPRESSIONS[compression](filename, mode)
+
+
+class ThreadedReader(io.RawIOBase):
+    """
+    Binary stream read from file by separate thread: blocks of read_size bytes are passed through queue
+    of at most queue_size blocks, so decompression (which releases GIL) runs along with parsing
+    """
+
+    def __init__(self, file: tp.BinaryIO, read_size: int = DEFAULT_READ_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        :param file: file opened for binary reading (closed with the stream)
+        :param read_size: number of bytes read at once
+        :param queue_size: number of blocks read ahead
+        """
+        super().__init__()
+        self._file = file
+        self._read_size = read_size
+        self._queue: queue.Queue[bytes | BaseException] = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._block = memoryview(b'')
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self._thread.start()
+
+    def _read_ahead(self) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._file.read(self._read_size)
+                self._put(block)
+                if not block:
+                    break
+        except BaseException as error:
+            self._put(error)
+
+    def _put(self, item: bytes | BaseException) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: tp.Any) -> int:
+        if not self._block:
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                self._queue.put(item)  # keep returning EOF
+                return 0
+            self._block = memoryview(item)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._file.close()
+        super().close()
+
+
+def open_text(filename: str, compression: str | None = 'auto') -> tp.TextIO:
+    """
+    Open text file for reading; compressed file is decompressed by separate thread (see ThreadedReader)
+    :param compression: see detect
+    """
+    compression = detect(filename, compression)
+    if compression is None:
+        return open(filename)
+    return io.TextIOWrapper(io.BufferedReader(ThreadedReader(COMPRESSIONS[compression](filename, 'rb'))))
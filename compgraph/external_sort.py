@@ -1,49 +1,216 @@
+import heapq
+import os
+import pickle
+import sys
+import tempfile
 import typing as tp
 
 from multiprocessing import Pipe, Process, connection
-from operator import itemgetter
 
 from . import operations as ops
+from .compression import open_binary
+from .rowio import dump_rows, load_rows
 
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 10000
+SIZE_SAMPLES = 16  # rows of every received chunk measured to estimate memory taken by its rows
 
-def do_sort(endpoint: connection.Connection, keys: tuple[str, ...]) -> None:
-    rows = []
+
+def sort_key(keys: tp.Sequence[str]) -> tp.Callable[[ops.TRow], tp.Any]:
+    """Build key function comparing rows by values of keys (as tuple)"""
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row[key],)
+    return lambda row: tuple(row[key] for key in keys)
+
+
+def sorted_runs(rows: tp.Iterable[tuple[ops.TRow, int]], keys: tp.Sequence[str],
+                memory_limit: int, directory: str, compression: str | None = None) -> ops.TRowsGenerator:
+    """
+    Sort rows with bounded memory: rows are collected into runs of at most memory_limit bytes (approximate size
+    is passed along with every row), each run is sorted and spilled to directory, runs are merged at the end.
+    If everything fits into one run it is sorted in memory without touching disk.
+    :param rows: pairs (row, approximate size of row in bytes)
+    :param keys: sorting keys
+    :param memory_limit: approximate size of one run in bytes
+    :param directory: directory for spill files
+    :param compression: compression of spill files (see compression.COMPRESSIONS)
+    """
+    key = sort_key(keys)
+    run: list[ops.TRow] = []
+    run_size = 0
+    run_files: list[str] = []
+    for row, size in rows:
+        run.append(row)
+        run_size += size
+        if run_size >= memory_limit:
+            run.sort(key=key)
+            filename = os.path.join(directory, f'run_{len(run_files)}')
+            with open_binary(filename, 'wb', compression) as f:
+                dump_rows(run, f)
+            run_files.append(filename)
+            run = []
+            run_size = 0
+    run.sort(key=key)
+    if not run_files:
+        yield from run
+        return
+    yield from heapq.merge(*(load_rows(filename, compression) for filename in run_files), iter(run), key=key)
+
+
+TByteCounter = tp.Callable[[int], None]
+
+
+def send_rows(endpoint: connection.Connection, rows: tp.Iterable[ops.TRow], chunk_size: int,
+              counter: TByteCounter | None = None) -> int:
+    """
+    Send rows through endpoint in lists of at most chunk_size rows followed by None
+    :param counter: if given, called with size (in bytes) of every pickled list sent
+    :return: number of rows sent
+    """
+    count = 0
+    chunk: list[ops.TRow] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _send(endpoint, chunk, counter)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        _send(endpoint, chunk, counter)
+        count += len(chunk)
+    _send(endpoint, None, counter)
+    return count
+
+
+def _send(endpoint: connection.Connection, chunk: list[ops.TRow] | None, counter: TByteCounter | None) -> None:
+    if counter is None:
+        endpoint.send(chunk)
+        return
+    data = pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)
+    counter(len(data))
+    endpoint.send_bytes(data)
+
+
+def recv_rows(endpoint: connection.Connection, counter: TByteCounter | None = None) -> ops.TRowsGenerator:
+    """
+    Receive rows sent by send_rows
+    :param counter: if given, called with size (in bytes) of every pickled list received
+    """
     while True:
-        row = endpoint.recv()
-        if row is None:
+        if counter is None:
+            chunk = endpoint.recv()
+        else:
+            data = endpoint.recv_bytes()
+            counter(len(data))
+            chunk = pickle.loads(data)
+        if chunk is None:
             break
-        rows.append(row)
-    rows.sort(key=itemgetter(*keys))
-    for row in rows:
-        endpoint.send(row)
-    endpoint.send(None)
+        yield from chunk
+
+
+def row_size(row: ops.TRow) -> int:
+    """
+    Approximate memory taken by row kept in list: the dict, its values (nested values are not followed)
+    and the list slot. Column names are shared by rows, so they are not counted
+    """
+    return sys.getsizeof(row) + sum(map(sys.getsizeof, row.values())) + 8
+
+
+def recv_sized_rows(endpoint: connection.Connection) -> tp.Generator[tuple[ops.TRow, int], None, None]:
+    """
+    Receive rows sent by send_rows along with their approximate size in memory
+    (average of row_size of about SIZE_SAMPLES rows spread over every chunk)
+    """
+    while True:
+        chunk = endpoint.recv()
+        if chunk is None:
+            break
+        samples = chunk[::max(1, len(chunk) // SIZE_SAMPLES)]
+        size = sum(map(row_size, samples)) // len(samples)
+        for row in chunk:
+            yield row, size
+
+
+def do_sort(endpoint: connection.Connection, keys: tuple[str, ...], memory_limit: int, chunk_size: int,
+            compression: str | None = None) -> None:
+    with tempfile.TemporaryDirectory(prefix='compgraph_sort_') as directory:
+        rows = sorted_runs(recv_sized_rows(endpoint), keys, memory_limit, directory, compression)
+        send_rows(endpoint, rows, chunk_size)
 
 
 class ExternalSort(ops.Operation):
     """
     In order to not account materialization during sorting in main process memory consumption, we delegate
     sorting to a separate process.
+    The separate process keeps at most memory_limit bytes of rows in memory (estimated with sys.getsizeof
+    of sampled rows, see row_size), sorted runs above that are spilled to temporary files and merged with heapq.merge.
+    Rows travel through the pipe in chunks of chunk_size rows, so pickling and syscalls are paid per chunk.
     This class illustrates cross-process streaming.
     """
+    kind = 'Sort'
+    processes = 1
+    # called with size of every chunk shipped through the pipe in either direction (set by profiler)
+    counter: TByteCounter | None = None
 
-    def __init__(self, keys: tp.Sequence[str]):
+    def __init__(self, keys: tp.Sequence[str], memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, compression: str | None = None):
+        """
+        :param keys: sorting keys
+        :param memory_limit: approximate amount of memory (in bytes) for rows held by the sorting process
+        :param chunk_size: number of rows sent through the pipe at once in both directions
+        :param compression: compression of spill files, e.g. 'gzip-fast' (see compression.COMPRESSIONS)
+        """
         self.keys = keys
+        self.memory_limit = memory_limit
+        self.chunk_size = chunk_size
+        self.compression = compression
 
     def __call__(self, rows: ops.TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
         local_endpoint, remote_endpoint = Pipe()
-        process = Process(target=do_sort, args=(remote_endpoint, self.keys))
+        process = Process(target=do_sort,
+                          args=(remote_endpoint, tuple(self.keys), self.memory_limit, self.chunk_size,
+                                self.compression))
         process.start()
-        row_count_before = 0
-        for row in rows:
-            local_endpoint.send(row)
-            row_count_before += 1
-        local_endpoint.send(None)
+        row_count_before = send_rows(local_endpoint, rows, self.chunk_size, self.counter)
         row_count_after = 0
-        while True:
-            local_endpoint_row = local_endpoint.recv()
-            if local_endpoint_row is None:
-                break
-            yield local_endpoint_row
+        for row in recv_rows(local_endpoint, self.counter):
+            yield row
             row_count_after += 1
         assert row_count_before == row_count_after
         process.join()
+
+    def output_order(self, input_orders: tp.Sequence[ops.TOrder]) -> ops.TOrder:
+        return tuple(self.keys)
+
+    def output_columns(self, input_columns: tp.Sequence[ops.TColumns]) -> ops.TColumns:
+        return input_columns[0]
+
+    def required_columns(self, columns: ops.TColumns) -> ops.TColumns:
+        return None if columns is None else set(columns) | set(self.keys)
+
+
+class Presorted(ops.Operation):
+    """Stands for ExternalSort whose input is known to be sorted by its keys already: rows are passed as they are"""
+    kind = 'Sort'
+
+    def __init__(self, sort: ExternalSort, input_order: ops.TOrder) -> None:
+        """
+        :param sort: skipped sort
+        :param input_order: keys input rows are known to be sorted by (sort keys are its prefix)
+        """
+        self.sort = sort
+        self.keys = sort.keys
+        self.input_order = input_order
+
+    def __call__(self, rows: ops.TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
+        yield from rows
+
+    def output_order(self, input_orders: tp.Sequence[ops.TOrder]) -> ops.TOrder:
+        return input_orders[0]
+
+    def output_columns(self, input_columns: tp.Sequence[ops.TColumns]) -> ops.TColumns:
+        return input_columns[0]
+
+    def required_columns(self, columns: ops.TColumns) -> ops.TColumns:
+        return columns
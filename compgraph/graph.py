@@ -1,20 +1,25 @@
 import copy
 import typing as tp
-from .external_sort import ExternalSort
+from .external_sort import ExternalSort, DEFAULT_MEMORY_LIMIT, DEFAULT_CHUNK_SIZE
 from . import operations as ops
+from . import cache
+from . import parsers
+from . import plan
+from . import sinks
+from .profiling import ProfiledRun
+from .parallel import ParallelMap, ParallelRead, PartitionedReduce
 
 
 class Graph:
     """Computational graph implementation"""
 
     def __init__(self, factory: ops.Operation) -> None:
-        self.__stream: ops.Operation = factory
-        self.__op_list: list[tp.Callable[[ops.TRowsIterable], ops.TRowsGenerator]] = list()
+        self.__step = plan.Step(factory)
 
-    def __add_operation(self, operation: tp.Callable[[ops.TRowsIterable], ops.TRowsGenerator]) -> 'Graph':
-        cop = copy.deepcopy(self)
-        cop.__op_list.append(operation)
-        return cop
+    def __add_operation(self, operation: ops.Operation, *inputs: 'Graph') -> 'Graph':
+        graph = copy.copy(self)
+        graph.__step = plan.Step(operation, [self.__step, *(input_graph.__step for input_graph in inputs)])
+        return graph
 
     @staticmethod
     def graph_from_iter(name: str) -> 'Graph':
@@ -26,32 +31,93 @@ class Graph:
         return Graph(ops.ReadIterFactory(name))
 
     @staticmethod
-    def graph_from_file(filename: str, parser: tp.Callable[[str], ops.TRow]) -> 'Graph':
+    def graph_from_file(filename: str, parser: parsers.TParser = 'auto', batch_size: int | None = 1000,
+                        workers: int | None = None, ordered: bool = True) -> 'Graph':
         """Construct new graph extended with operation for reading rows from file
         Use ops.Read
+        :param filename: filename to read from; .gz, .bz2, .xz and .zst (if zstandard is installed) files
+            are decompressed by separate thread
+        :param parser: parser from string to Row, or name of parser in parsers.PARSERS ('auto' detects
+            JSON lines or Python literals by the first line of file)
+        :param batch_size: number of lines parsed at once, None to parse lines one by one
+        :param workers: number of processes to parse memory-mapped file in parallel with (by ranges of lines),
+            None to read file in current process; compressed files are read in current process only
+        :param ordered: for workers, whether rows have to come in order of file
+        """
+        if isinstance(parser, str):
+            parser = parsers.get_parser(parser)
+        if workers is not None:
+            return Graph(ParallelRead(filename, parser, workers, ordered))
+        return Graph(ops.Read(filename, parser, batch_size))
+
+    @staticmethod
+    def graph_from_binary_file(filename: str) -> 'Graph':
+        """Construct new graph reading rows from file in binary row format (written by run_to_binary_file
+        or run_to_file), which is read many times faster than text parsed line by line
+        Use ops.ReadBinary
         :param filename: filename to read from
-        :param parser: parser from string to Row
         """
-        return Graph(ops.Read(filename, parser))
+        return Graph(ops.ReadBinary(filename))
 
-    def map(self, mapper: ops.Mapper) -> 'Graph':
+    def map(self, mapper: ops.Mapper, workers: int | None = None, ordered: bool = True,
+            batch_size: int | None = None) -> 'Graph':
         """Construct new graph extended with map operation with particular mapper
         :param mapper: mapper to use
+        :param workers: number of processes to map in parallel with, None to map in current process
+        :param ordered: for parallel map, whether order of rows has to be kept
+        :param batch_size: if given, rows are mapped in column-oriented batches of this size (mapper.map_batch);
+            consecutive batched operations pass batches to each other without converting them to rows
         """
+        if workers is not None:
+            return self.__add_operation(ParallelMap(mapper, workers, ordered))
+        if batch_size is not None:
+            return self.__add_operation(ops.BatchMap(mapper, batch_size))
         return self.__add_operation(ops.Map(mapper))
 
-    def reduce(self, reducer: ops.Reducer, keys: tp.Sequence[str]) -> 'Graph':
+    def reduce(self, reducer: ops.Reducer, keys: tp.Sequence[str], presorted: bool = True,
+               max_rows: int | None = 1000000, combined: bool = False, workers: int | None = None,
+               ordered: bool = True, batched: bool = False) -> 'Graph':
         """Construct new graph extended with reduce operation with particular reducer
         :param reducer: reducer to use
         :param keys: keys for grouping
+        :param presorted: whether rows come sorted by keys; otherwise rows are grouped in hash table
+            (no sort is needed, order of groups in result is not defined)
+        :param max_rows: for presorted=False, number of rows (groups, for combinable reducers such as Count,
+            Sum and Mean) kept in memory before spilling to disk
+        :param combined: whether rows were pre-aggregated by combine with the same reducer
+        :param workers: number of processes to partition rows between; every process sorts and reduces
+            its partition, so rows don't have to be sorted (replaces sort(keys).reduce(reducer, keys))
+        :param ordered: for workers, whether result has to be sorted by keys
+        :param batched: for presorted rows, pass every group to reducer.reduce_batch as one column-oriented batch
+            (group is held in memory)
+        """
+        if workers is not None:
+            return self.__add_operation(PartitionedReduce(reducer, keys, workers, ordered, combined))
+        if not presorted:
+            return self.__add_operation(ops.HashReduce(reducer, keys, max_rows, combined=combined))
+        if batched and not combined:
+            return self.__add_operation(ops.BatchReduce(reducer, keys))
+        return self.__add_operation(ops.Reduce(reducer, keys, combined))
+
+    def combine(self, reducer: ops.CombinableReducer, keys: tp.Sequence[str], max_groups: int = 100000) -> 'Graph':
+        """Construct new graph extended with pre-aggregation of rows (map-side combiner).
+        Result rows hold partial states and must be finished by reduce with combined=True
+        :param reducer: combinable reducer to pre-aggregate with
+        :param keys: keys for grouping
+        :param max_groups: number of groups kept in memory
         """
-        return self.__add_operation(ops.Reduce(reducer, keys))
+        return self.__add_operation(ops.Combine(reducer, keys, max_groups))
 
-    def sort(self, keys: tp.Sequence[str]) -> 'Graph':
+    def sort(self, keys: tp.Sequence[str], memory_limit: int = DEFAULT_MEMORY_LIMIT,
+             chunk_size: int = DEFAULT_CHUNK_SIZE, compression: str | None = None) -> 'Graph':
         """Construct new graph extended with sort operation
         :param keys: sorting keys (typical is tuple of strings)
+        :param memory_limit: approximate amount of memory (in bytes) sorting may use before spilling to disk
+        :param chunk_size: number of rows transferred to and from sorting process at once
+        :param compression: compression of spilled runs, e.g. 'gzip-fast' (see compression.COMPRESSIONS),
+            to trade CPU for disk I/O
         """
-        return self.__add_operation(ExternalSort(keys))
+        return self.__add_operation(ExternalSort(keys, memory_limit, chunk_size, compression))
 
     def join(self, joiner: ops.Joiner, join_graph: 'Graph', keys: tp.Sequence[str]) -> 'Graph':
         """Construct new graph extended with join operation with another graph
@@ -59,15 +125,93 @@ class Graph:
         :param join_graph: other graph to join with
         :param keys: keys for grouping
         """
+        return self.__add_operation(ops.Join(joiner, keys), join_graph)
+
+    def hash_join(self, joiner: ops.Joiner, join_graph: 'Graph', keys: tp.Sequence[str]) -> 'Graph':
+        """Construct new graph extended with hash join operation with another graph.
+        Unlike join, inputs don't have to be sorted by keys; order of result rows is not defined
+        :param joiner: join strategy to use
+        :param join_graph: other graph to join with
+        :param keys: keys for grouping
+        """
+        return self.__add_operation(ops.HashJoin(joiner, keys), join_graph)
 
-        def wrap(rows: ops.TRowsIterable, **kwargs: dict[str, tp.Any]) -> ops.TRowsGenerator:
-            return ops.Join(joiner, keys)(rows, join_graph.run(**kwargs))
+    @tp.overload
+    def run(self, *, optimize: bool = ..., fuse: bool = ..., profile: tp.Literal[False] = ...,
+            cache_dir: str | None = ..., **kwargs: tp.Any) -> ops.TRowsIterable: ...
 
-        return self.__add_operation(wrap)
+    @tp.overload
+    def run(self, *, optimize: bool = ..., fuse: bool = ..., profile: tp.Literal[True],
+            cache_dir: str | None = ..., **kwargs: tp.Any) -> ProfiledRun: ...
+
+    def run(self, *, optimize: bool = True, fuse: bool = True, profile: bool = False,
+            cache_dir: str | None = None, **kwargs: tp.Any) -> ops.TRowsIterable | ProfiledRun:
+        """Single method to start execution; data sources passed as kwargs.
+        Parts of computation shared by several branches (e.g. graph joined with its own descendant)
+        are executed once, their output is spilled to disk and read by every branch
+        :param optimize: whether filters are moved ahead of sorts, mappers and joins not changing columns they read
+            (see plan.push_filters), columns not needed by the rest of graph are dropped before sorts and joins
+            (see required_columns of operations) and sorts of rows sorted already are skipped
+            (see output_order of operations)
+        :param fuse: whether consecutive maps are fused into one operation (disable to debug single maps)
+        :param profile: whether to measure every operation: result is ProfiledRun, its report holds rows in/out,
+            time spent inside every operation, bytes shipped through sort pipes and RSS deltas once rows are read
+        :param cache_dir: directory to keep outputs of sorts, reduces, joins and of the whole graph in, keyed
+            by fingerprints of operations and input files (see cache.fingerprints); outputs kept by previous runs
+            are read instead of computing them, so only operations changed since then (and the ones after them)
+            are executed. Parts of graph reading rows passed as kwargs are not cached
+        """
+        root = self.__plan(optimize, fuse, cache_dir)
+        if profile:
+            return ProfiledRun(root, **kwargs)
+        return plan.execute(root, **kwargs)
+
+    def run_to_file(self, filename: str, format: str = 'jsonl', *, compression: str | None = 'auto',
+                    columns: tp.Sequence[str] | None = None, **kwargs: tp.Any) -> int:
+        """Run graph and write result to file: rows are serialized in batches through large write buffer
+        :param filename: filename to write to
+        :param format: 'jsonl' (JSON lines), 'tsv' or 'binary' (binary row format read by graph_from_binary_file),
+            see sinks.SINKS
+        :param compression: 'gzip', 'bz2', 'xz', None for plain file, 'auto' to choose it by suffix of filename
+        :param columns: for tsv, columns to write (taken from the first row if not given); for binary,
+            columns shared by rows (such rows are stored without column names)
+        :param kwargs: arguments of run
+        :return: number of rows written
+        """
+        options: dict[str, tp.Any] = dict() if columns is None else dict(columns=columns)
+        return sinks.write_rows(self.run(**kwargs), filename, format, compression, **options)
+
+    def run_to_binary_file(self, filename: str, *, schema: tp.Sequence[str] | None = None,
+                           **kwargs: tp.Any) -> int:
+        """Run graph and write result to file in binary row format (read by graph_from_binary_file),
+        e.g. to convert text input once: Graph.graph_from_file(...).run_to_binary_file(...)
+        :param filename: filename to write to
+        :param schema: columns shared by result rows, such rows are stored without column names
+        :param kwargs: arguments of run
+        :return: number of rows written
+        """
+        return self.run_to_file(filename, 'binary', compression=None, columns=schema, **kwargs)
+
+    def physical_plan(self, *, optimize: bool = True, fuse: bool = True, cache_dir: str | None = None) -> plan.Plan:
+        """Physical plan run will execute with the same flags: its operations (Read, Map, Reduce, Sort, Join),
+        their keys and inputs, number of sorts and spawned processes
+        """
+        return plan.Plan(self.__plan(optimize, fuse, cache_dir))
+
+    def explain(self, *, optimize: bool = True, fuse: bool = True, cache_dir: str | None = None) -> str:
+        """Describe physical plan run will execute with the same flags: one line per operation,
+        including sorts skipped since their input is sorted already, and summary (use print to show it)
+        """
+        return str(self.physical_plan(optimize=optimize, fuse=fuse, cache_dir=cache_dir))
 
-    def run(self, **kwargs: tp.Any) -> ops.TRowsIterable:
-        """Single method to start execution; data sources passed as kwargs"""
-        res = self.__stream(**kwargs)
-        for op in self.__op_list:
-            res = op(res, **kwargs)
-        return res
+    def __plan(self, optimize: bool, fuse: bool, cache_dir: str | None = None) -> plan.Node:
+        root = plan.build(self.__step)
+        if optimize:
+            plan.push_filters(root)
+            plan.skip_sorts(root)
+            plan.prune_columns(root)
+        if fuse:
+            root = plan.fuse_maps(root)
+        if cache_dir is not None:
+            root = cache.apply(root, cache_dir)
+        return root
@@ -1,34 +1,181 @@
 import heapq
+import os
+import tempfile
 from abc import abstractmethod, ABC
 import typing as tp
 import re
 import itertools
 from collections import defaultdict
+from operator import itemgetter
 from math import radians, sin, cos, asin, sqrt
 
+from .compression import open_text
+from .parsers import Parser
+from .rowio import RowWriter, load_rows, read_binary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
 TRow = dict[str, tp.Any]
 TRowsIterable = tp.Iterable[TRow]
 TRowsGenerator = tp.Generator[TRow, None, None]
+TColumns = tp.AbstractSet[str] | None
+TOrder = tuple[str, ...]
+
+
+class Batch:
+    """Column-oriented batch of rows having the same columns"""
+
+    def __init__(self, columns: dict[str, tp.Sequence[tp.Any]], size: int) -> None:
+        """
+        :param columns: values of every column, all sequences have length size
+        :param size: number of rows
+        """
+        self.columns = columns
+        self.size = size
+
+    @staticmethod
+    def from_rows(rows: tp.Sequence[TRow]) -> 'Batch':
+        """
+        :param rows: rows with the same columns
+        """
+        if not rows:
+            return Batch(dict(), 0)
+        return Batch({name: list(map(itemgetter(name), rows)) for name in rows[0]}, len(rows))
+
+    def rows(self) -> TRowsGenerator:
+        """Iterate over rows of batch"""
+        rows: list[TRow] = [dict() for _ in range(self.size)]
+        for name, values in self.columns.items():
+            for row, value in zip(rows, values):
+                row[name] = value
+        yield from rows
+
+
+TBatchesIterable = tp.Iterable[Batch]
+TBatchesGenerator = tp.Generator[Batch, None, None]
+
+
+def to_batches(rows: TRowsIterable, batch_size: int) -> TBatchesGenerator:
+    """Group consecutive rows having the same columns into batches of at most batch_size rows"""
+    rows_iter = iter(rows)
+    while chunk := list(itertools.islice(rows_iter, batch_size)):
+        for _, group in itertools.groupby(chunk, key=dict.keys):
+            yield Batch.from_rows(list(group))
+
+
+def from_batches(batches: TBatchesIterable) -> TRowsGenerator:
+    """Iterate over rows of all batches"""
+    for batch in batches:
+        yield from batch.rows()
+
+
+def order_before(order: TOrder, columns: tp.Iterable[str]) -> TOrder:
+    """Part of sort order which is kept when columns are modified: keys preceding the first modified one"""
+    modified = set(columns)
+    for index, key in enumerate(order):
+        if key in modified:
+            return order[:index]
+    return order
+
+
+def order_within(order: TOrder, columns: tp.Iterable[str]) -> TOrder:
+    """Part of sort order which is kept when only columns are left"""
+    kept = set(columns)
+    for index, key in enumerate(order):
+        if key not in kept:
+            return order[:index]
+    return order
+
+
+def _key_getter(keys: tp.Sequence[str]) -> tp.Callable[[TRow], tp.Any]:
+    """Get values of keys from row; results compare the same way as tuples of values do"""
+    if not keys:
+        return lambda row: ()
+    return itemgetter(*keys)
 
 
 class Operation(ABC):
+    kind = 'Operation'  # Read, Map, Reduce, Sort or Join (used to describe plans)
+    processes = 0  # number of processes operation spawns
+
     @abstractmethod
     def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
         pass
 
+    def required_columns(self, columns: TColumns) -> TColumns:
+        """
+        Columns of input rows (of every input) needed to produce given columns of result rows
+        :param columns: needed columns of result, None means all columns
+        :return: needed columns of input, None means all columns (the default, when operation does not know)
+        """
+        return None
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        """
+        Keys result rows are known to be sorted by
+        :param input_orders: keys rows of every input are known to be sorted by
+        :return: keys, () when order is not known (the default)
+        """
+        return ()
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        """
+        Columns result rows may have
+        :param input_columns: columns rows of every input may have (None means unknown)
+        :return: columns, None when operation does not know (the default)
+        """
+        return None
+
 
 class Read(Operation):
-    def __init__(self, filename: str, parser: tp.Callable[[str], TRow]) -> None:
+    kind = 'Read'
+
+    def __init__(self, filename: str, parser: tp.Callable[[str], TRow], batch_size: int | None = None) -> None:
+        """
+        :param filename: filename to read from (.gz, .bz2, .xz and .zst files are decompressed by separate thread)
+        :param parser: parser from string to Row; format of parsers.Parser may be chosen by the first line of file
+        :param batch_size: if given, lines are parsed in batches of this size (see parsers.Parser.parse_batch)
+        """
         self.filename = filename
         self.parser = parser
+        self.batch_size = batch_size
 
     def __call__(self, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
-        with open(self.filename) as f:
-            for line in f:
-                yield self.parser(line)
+        with open_text(self.filename) as f:
+            parser = self.parser
+            lines: tp.Iterable[str] = f
+            if isinstance(parser, Parser):
+                first_line = f.readline()
+                if not first_line:
+                    return
+                parser = parser.detect(first_line)
+                lines = itertools.chain([first_line], f)
+            if self.batch_size is None:
+                for line in lines:
+                    yield parser(line)
+                return
+            parse_batch = parser.parse_batch if isinstance(parser, Parser) else lambda batch: map(parser, batch)
+            while batch := list(itertools.islice(lines, self.batch_size)):
+                yield from parse_batch(batch)
+
+
+class ReadBinary(Operation):
+    """Read rows from file written in binary row format (see rowio.BinaryWriter)"""
+    kind = 'Read'
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    def __call__(self, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        yield from read_binary(self.filename)
 
 
 class ReadIterFactory(Operation):
+    kind = 'Read'
+
     def __init__(self, name: str) -> None:
         self.name = name
 
@@ -50,8 +197,51 @@ class Mapper(ABC):
         """
         pass
 
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        """
+        Map column-oriented batch of rows. By default rows are mapped one by one,
+        mappers override it with column-wise implementation (which must not modify columns of batch in place)
+        :param batch: rows with the same columns
+        """
+        yield from to_batches((result for row in batch.rows() for result in self(row)), max(batch.size, 1))
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        """
+        Columns of input row needed to produce given columns of result rows
+        :param columns: needed columns of result, None means all columns
+        :return: needed columns of input, None means all columns (the default, when mapper does not know)
+        """
+        return None
+
+    def preserved_order(self, order: TOrder) -> TOrder:
+        """
+        Part of sort order of input rows which result rows keep (rows are mapped in order,
+        so it is the keys preceding the first column mapper may change)
+        :param order: keys input rows are sorted by
+        :return: keys, () when mapper does not know (the default)
+        """
+        return ()
+
+    def output_columns(self, columns: TColumns) -> TColumns:
+        """
+        Columns result rows may have
+        :param columns: columns input rows may have, None means unknown
+        :return: columns, None when mapper does not know (the default)
+        """
+        return None
+
+    def changed_columns(self) -> TColumns:
+        """
+        Columns mapper may add, replace or remove, if it passes all the other columns through unchanged
+        (rows may be dropped or multiplied); filters reading none of them may be applied before mapper
+        :return: columns, None when mapper does not know (the default)
+        """
+        return None
+
 
 class Map(Operation):
+    kind = 'Map'
+
     def __init__(self, mapper: Mapper) -> None:
         self.mapper = mapper
 
@@ -59,6 +249,109 @@ class Map(Operation):
         for i in rows:
             yield from self.mapper(i)
 
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        return self.mapper.preserved_order(input_orders[0])
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.mapper.output_columns(input_columns[0])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.mapper.required_columns(columns)
+
+
+class Prune(Operation):
+    """Drop columns which are not listed (listed columns missing in row are skipped); rows having only listed
+    columns are passed as they are"""
+    kind = 'Map'
+
+    def __init__(self, columns: tp.AbstractSet[str]) -> None:
+        """
+        :param columns: columns to keep
+        """
+        self.columns = columns
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        columns = self.columns
+        for row in rows:
+            if row.keys() <= columns:
+                yield row
+            else:
+                yield {key: value for key, value in row.items() if key in columns}
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        return order_within(input_orders[0], self.columns)
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.columns if input_columns[0] is None else set(input_columns[0]) & self.columns
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.columns if columns is None else set(columns) & self.columns
+
+
+class FusedMap(Operation):
+    """
+    Chain of maps applied in one pass: every mapper is driven by itertools (map + chain.from_iterable)
+    instead of a separate Map generator
+    """
+    kind = 'Map'
+
+    def __init__(self, mappers: tp.Sequence[Mapper]) -> None:
+        """
+        :param mappers: mappers in order of application
+        """
+        self.mappers = mappers
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        for mapper in self.mappers:
+            rows = itertools.chain.from_iterable(map(mapper, rows))
+        yield from rows
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        order = input_orders[0]
+        for mapper in self.mappers:
+            order = mapper.preserved_order(order)
+        return order
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        columns = input_columns[0]
+        for mapper in self.mappers:
+            columns = mapper.output_columns(columns)
+        return columns
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        for mapper in reversed(self.mappers):
+            columns = mapper.required_columns(columns)
+        return columns
+
+
+class BatchMap(Operation):
+    """Map column-oriented batches of rows with mapper.map_batch"""
+    kind = 'Map'
+
+    def __init__(self, mapper: Mapper, batch_size: int = 1000) -> None:
+        """
+        :param mapper: mapper to use
+        :param batch_size: number of rows in batch
+        """
+        self.mapper = mapper
+        self.batch_size = batch_size
+
+    def map_batches(self, batches: TBatchesIterable) -> TBatchesGenerator:
+        for batch in batches:
+            yield from self.mapper.map_batch(batch)
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        yield from from_batches(self.map_batches(to_batches(rows, self.batch_size)))
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        return self.mapper.preserved_order(input_orders[0])
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.mapper.output_columns(input_columns[0])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.mapper.required_columns(columns)
+
 
 class Reducer(ABC):
     """Base class for reducers"""
@@ -70,15 +363,352 @@ class Reducer(ABC):
         """
         pass
 
+    def reduce_batch(self, group_key: tuple[str, ...], batch: Batch) -> TBatchesGenerator:
+        """
+        Reduce group given as column-oriented batch. By default rows are passed to reducer one by one,
+        reducers override it with column-wise implementation
+        :param batch: rows of group
+        """
+        yield from to_batches(self(group_key, batch.rows()), max(batch.size, 1))
+
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        """
+        Columns of input rows needed to produce given columns of result rows
+        :param group_key: keys of grouping
+        :param columns: needed columns of result, None means all columns
+        :return: needed columns of input, None means all columns (the default, when reducer does not know)
+        """
+        return None
+
+    def output_columns(self, group_key: tuple[str, ...]) -> TColumns:
+        """
+        Columns result rows may have
+        :param group_key: keys of grouping
+        :return: columns, None when reducer does not know (the default)
+        """
+        return None
+
+
+PARTIAL_STATE_COLUMN = '__partial_state__'
+_MISSING = object()
+
+
+class CombinableReducer(Reducer):
+    """
+    Base class for reducers which allow pre-aggregation: every row is turned into partial state,
+    partial states of a group are merged in any order and result rows are built from the merged state
+    """
+
+    @abstractmethod
+    def partial(self, row: TRow) -> tp.Any:
+        """
+        :param row: one table row
+        :return: partial state of group consisting of this row only
+        """
+        pass
+
+    @abstractmethod
+    def merge(self, state: tp.Any, other_state: tp.Any) -> tp.Any:
+        """
+        :return: partial state of union of two groups
+        """
+        pass
+
+    @abstractmethod
+    def finalize(self, group_key: tuple[str, ...], row: TRow, state: tp.Any) -> TRowsGenerator:
+        """
+        :param group_key: keys of grouping
+        :param row: any row of group to take values of keys from
+        :param state: partial state of the whole group
+        """
+        pass
+
+    def __call__(self, group_key: tuple[str, ...], rows: TRowsIterable) -> TRowsGenerator:
+        rows_iter = iter(rows)
+        row = next(rows_iter)
+        state = self.partial(row)
+        for row in rows_iter:
+            state = self.merge(state, self.partial(row))
+        yield from self.finalize(group_key, row, state)
+
+    def reduce_partials(self, group_key: tuple[str, ...], rows: TRowsIterable) -> TRowsGenerator:
+        """Finish group of rows with partial states produced by Combine"""
+        rows_iter = iter(rows)
+        row = next(rows_iter)
+        state = row[PARTIAL_STATE_COLUMN]
+        for row in rows_iter:
+            state = self.merge(state, row[PARTIAL_STATE_COLUMN])
+        yield from self.finalize(group_key, row, state)
+
+
+def _check_combined(reducer: Reducer, combined: bool) -> None:
+    if combined and not isinstance(reducer, CombinableReducer):
+        raise TypeError(f'{type(reducer).__name__} can not reduce combined rows')
+
+
+def _reduce_required_columns(reducer: Reducer, keys: tp.Sequence[str], combined: bool,
+                             columns: TColumns) -> TColumns:
+    """Columns needed by reduce operations: rows combined by Combine hold only keys and partial state"""
+    if combined:
+        return set(keys) | {PARTIAL_STATE_COLUMN}
+    return reducer.required_columns(tuple(keys), columns)
+
 
 class Reduce(Operation):
-    def __init__(self, reducer: Reducer, keys: tp.Sequence[str]) -> None:
+    kind = 'Reduce'
+
+    def __init__(self, reducer: Reducer, keys: tp.Sequence[str], combined: bool = False) -> None:
+        """
+        :param reducer: reducer to use
+        :param keys: keys for grouping
+        :param combined: whether rows are partial states produced by Combine with the same reducer
+        """
+        _check_combined(reducer, combined)
         self.reducer = reducer
         self.keys = keys
+        self.combined = combined
 
     def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        reduce: tp.Callable[[tuple[str, ...], TRowsIterable], TRowsGenerator] = self.reducer
+        if isinstance(self.reducer, CombinableReducer) and self.combined:
+            reduce = self.reducer.reduce_partials
         for value, group in itertools.groupby(rows, key=lambda x: tuple(x[i] for i in self.keys)):
-            yield from self.reducer(tuple(self.keys), group)
+            yield from reduce(tuple(self.keys), group)
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        return order_within(input_orders[0], self.keys)
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.reducer.output_columns(tuple(self.keys))
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return _reduce_required_columns(self.reducer, self.keys, self.combined, columns)
+
+
+class BatchReduce(Operation):
+    """
+    Reduce passing every group to reducer.reduce_batch as one column-oriented batch (so group is materialized).
+    Groups whose rows have different columns are reduced row by row.
+    """
+    kind = 'Reduce'
+
+    def __init__(self, reducer: Reducer, keys: tp.Sequence[str]) -> None:
+        """
+        :param reducer: reducer to use
+        :param keys: keys for grouping
+        """
+        self.reducer = reducer
+        self.keys = keys
+
+    def reduce_batches(self, rows: TRowsIterable) -> TBatchesGenerator:
+        group_key = tuple(self.keys)
+        for value, group in itertools.groupby(rows, key=_key_getter(self.keys)):
+            group_rows = list(group)
+            columns = group_rows[0].keys()
+            if all(row.keys() == columns for row in group_rows):
+                yield from self.reducer.reduce_batch(group_key, Batch.from_rows(group_rows))
+            else:
+                yield from to_batches(self.reducer(group_key, iter(group_rows)), len(group_rows))
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        yield from from_batches(self.reduce_batches(rows))
+
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        return order_within(input_orders[0], self.keys)
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.reducer.output_columns(tuple(self.keys))
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.reducer.required_columns(tuple(self.keys), columns)
+
+
+class Combine(Operation):
+    """
+    Pre-aggregate rows with combinable reducer in bounded hash table.
+    Yields rows with values of keys and partial state in PARTIAL_STATE_COLUMN (one row per group while the table
+    is not full; when max_groups groups are collected, all of them are flushed), which are to be finished
+    by Reduce or HashReduce with the same reducer and combined=True.
+    """
+    kind = 'Reduce'
+
+    def __init__(self, reducer: CombinableReducer, keys: tp.Sequence[str], max_groups: int = 100000) -> None:
+        """
+        :param reducer: reducer to pre-aggregate with
+        :param keys: keys for grouping
+        :param max_groups: number of groups kept in memory
+        """
+        self.reducer = reducer
+        self.keys = keys
+        self.max_groups = max_groups
+
+    def _flush(self, states: dict[tp.Any, tp.Any]) -> TRowsGenerator:
+        for value, state in states.items():
+            row = dict(zip(self.keys, value))
+            row[PARTIAL_STATE_COLUMN] = state
+            yield row
+        states.clear()
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        states: dict[tp.Any, tp.Any] = dict()
+        for row in rows:
+            value = tuple(row[i] for i in self.keys)
+            if value in states:
+                states[value] = self.reducer.merge(states[value], self.reducer.partial(row))
+                continue
+            if len(states) >= self.max_groups:
+                yield from self._flush(states)
+            states[value] = self.reducer.partial(row)
+        yield from self._flush(states)
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return set(self.keys) | {PARTIAL_STATE_COLUMN}
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.reducer.required_columns(tuple(self.keys), None)
+
+
+class HashReduce(Operation):
+    """
+    Reduce which does not require rows sorted by keys: groups are collected in hash table.
+    When more than max_rows rows are buffered, rows are spilled to disk partitioned by hash of keys
+    and every partition is reduced in memory separately.
+    Combinable reducers keep only values of keys and partial state per group; when more than max_rows groups
+    are collected, partial states are spilled the same way and merged partition by partition.
+    Order of groups in result is not defined.
+    """
+    kind = 'Reduce'
+
+    def __init__(self, reducer: Reducer, keys: tp.Sequence[str], max_rows: int | None = 1000000,
+                 partitions: int = 16, combined: bool = False) -> None:
+        """
+        :param reducer: reducer to use
+        :param keys: keys for grouping
+        :param max_rows: number of rows (groups, for combinable reducers) kept in memory before spilling,
+            None to never spill
+        :param partitions: number of spill partitions
+        :param combined: whether rows are partial states produced by Combine with the same reducer
+        """
+        _check_combined(reducer, combined)
+        self.reducer = reducer
+        self.keys = keys
+        self.max_rows = max_rows
+        self.partitions = partitions
+        self.combined = combined
+
+    def _merge_states(self, reducer: CombinableReducer, rows: tp.Iterable[TRow], combined: bool,
+                      states: dict[tp.Any, tp.Any], max_groups: int | None) -> bool:
+        """
+        Merge partial states of rows into states (values of keys -> state) until more than max_groups groups
+        are collected
+        :return: whether rows are exhausted
+        """
+        key = _key_getter(self.keys)
+        for row in rows:
+            state = row[PARTIAL_STATE_COLUMN] if combined else reducer.partial(row)
+            value = key(row)
+            previous = states.get(value, _MISSING)
+            if previous is not _MISSING:
+                states[value] = reducer.merge(previous, state)
+                continue
+            states[value] = state
+            if max_groups is not None and len(states) > max_groups:
+                return False
+        return True
+
+    def _key_row(self, value: tp.Any) -> TRow:
+        """Row holding values of keys (as returned by _key_getter)"""
+        if len(self.keys) == 1:
+            return {self.keys[0]: value}
+        return dict(zip(self.keys, value))
+
+    def _finalize_states(self, reducer: CombinableReducer, states: dict[tp.Any, tp.Any]) -> TRowsGenerator:
+        group_key = tuple(self.keys)
+        for value, state in states.items():
+            yield from reducer.finalize(group_key, self._key_row(value), state)
+
+    def _reduce_states(self, reducer: CombinableReducer, rows: TRowsIterable) -> TRowsGenerator:
+        states: dict[tp.Any, tp.Any] = dict()
+        rows_iter = iter(rows)
+        exhausted = self._merge_states(reducer, rows_iter, self.combined, states, self.max_rows)
+        if exhausted:
+            yield from self._finalize_states(reducer, states)
+            return
+        with tempfile.TemporaryDirectory(prefix='compgraph_reduce_') as directory:
+            filenames = [os.path.join(directory, f'partition_{i}') for i in range(self.partitions)]
+            files = [open(filename, 'wb') for filename in filenames]
+            try:
+                writers = [RowWriter(f) for f in files]
+                while True:
+                    for value, state in states.items():
+                        writers[hash(value) % self.partitions].write(self._key_row(value) |
+                                                                     {PARTIAL_STATE_COLUMN: state})
+                    states.clear()
+                    if exhausted:
+                        break
+                    exhausted = self._merge_states(reducer, rows_iter, self.combined, states, self.max_rows)
+                for writer in writers:
+                    writer.flush()
+            finally:
+                for f in files:
+                    f.close()
+            for filename in filenames:
+                self._merge_states(reducer, load_rows(filename), True, states, None)
+                yield from self._finalize_states(reducer, states)
+                states.clear()
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        if isinstance(self.reducer, CombinableReducer):
+            yield from self._reduce_states(self.reducer, rows)
+            return
+        key = _key_getter(self.keys)
+        groups: dict[tp.Any, list[TRow]] = defaultdict(list)
+        rows_iter = iter(rows)
+        for count, row in enumerate(rows_iter, 1):
+            groups[key(row)].append(row)
+            if self.max_rows is not None and count > self.max_rows:
+                yield from self._reduce_partitioned(groups, rows_iter)
+                return
+        yield from self._reduce_groups(groups)
+
+    def output_columns(self, input_columns: tp.Sequence[TColumns]) -> TColumns:
+        return self.reducer.output_columns(tuple(self.keys))
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return _reduce_required_columns(self.reducer, self.keys, self.combined, columns)
+
+    def _reduce_groups(self, groups: dict[tp.Any, list[TRow]]) -> TRowsGenerator:
+        group_key = tuple(self.keys)
+        for group in groups.values():
+            yield from self.reducer(group_key, iter(group))
+
+    def _reduce_partitioned(self, groups: dict[tp.Any, list[TRow]], rows: tp.Iterator[TRow]) -> TRowsGenerator:
+        key = _key_getter(self.keys)
+        with tempfile.TemporaryDirectory(prefix='compgraph_reduce_') as directory:
+            filenames = [os.path.join(directory, f'partition_{i}') for i in range(self.partitions)]
+            files = [open(filename, 'wb') for filename in filenames]
+            try:
+                writers = [RowWriter(f) for f in files]
+                for value, group in groups.items():
+                    writer = writers[hash(value) % self.partitions]
+                    for row in group:
+                        writer.write(row)
+                groups.clear()
+                for row in rows:
+                    writers[hash(key(row)) % self.partitions].write(row)
+                for writer in writers:
+                    writer.flush()
+            finally:
+                for f in files:
+                    f.close()
+            for filename in filenames:
+                for row in load_rows(filename):
+                    groups[key(row)].append(row)
+                yield from self._reduce_groups(groups)
+                groups.clear()
+
+
+RENAMED_ROWS_LIMIT = 10000
 
 
 class Joiner(ABC):
@@ -88,24 +718,101 @@ class Joiner(ABC):
         self._a_suffix = suffix_a
         self._b_suffix = suffix_b
 
+    @staticmethod
+    def _rename(row: TRow, columns: tp.AbstractSet[str], suffix: str) -> TRow:
+        return {(key + suffix if key in columns else key): value for key, value in row.items()}
+
+    def _merge(self, a_row: TRow, b_row: TRow, keys: tp.Sequence[str]) -> TRow:
+        collisions = (a_row.keys() & b_row.keys()).difference(keys)
+        if not collisions:
+            return a_row | b_row
+        return self._rename(a_row, collisions, self._a_suffix) | self._rename(b_row, collisions, self._b_suffix)
+
+    def preserved_order(self, keys: tp.Sequence[str], order: TOrder) -> TOrder:
+        """
+        Part of sort order of the left input (starting with join keys) which joined rows keep. By default only keys:
+        rows taken from the right input alone keep order of the right input within their group
+        :param keys: join keys
+        :param order: keys rows of the left input are sorted by
+        """
+        return tuple(keys)
+
+    def filtered_input(self, keys: tp.Sequence[str], reads: tp.Collection[str],
+                       input_columns: tp.Sequence[TColumns]) -> int | None:
+        """
+        Input a filter reading given columns may be applied to before join instead of after it
+        :param keys: join keys
+        :param reads: columns filter reads
+        :param input_columns: columns rows of the left and of the right input may have, None means unknown
+        :return: index of input, None if filter must stay after join (the default)
+        """
+        return None
+
+    def _left_order(self, keys: tp.Sequence[str], order: TOrder) -> TOrder:
+        """Left order is kept if every row contains a left row whose values are not replaced by right ones"""
+        return order if self._b_suffix else tuple(keys)
+
+    def required_columns(self, keys: tp.Sequence[str], columns: TColumns) -> TColumns:
+        """
+        Columns of both inputs needed to produce given columns of joined rows. A column renamed with suffix
+        is needed in both inputs under its original name, so that collision (and renaming) still happens
+        """
+        if columns is None:
+            return None
+        renamed = {column[:-len(suffix)] for column in columns for suffix in (self._a_suffix, self._b_suffix)
+                   if suffix and column.endswith(suffix)}
+        return set(columns) | set(keys) | renamed
+
     def _abs_joiner(self, a_empty: bool, b_empty: bool, keys: tp.Sequence[str],
                     rows_a: TRowsIterable, rows_b: TRowsIterable) -> TRowsGenerator:
-        mat_rows_b = list(rows_b)
-        if len(mat_rows_b) == 0 and a_empty:
-            yield from rows_a
+        """
+        Join two groups of rows having equal values of keys (Join and HashJoin pass groups like this).
+        When all right rows have the same columns, colliding columns are computed and right rows (unless there are
+        more than RENAMED_ROWS_LIMIT of them, then copies would take too much memory) are renamed only when
+        columns of left rows change.
+        :param a_empty: yield rows_a if rows_b is empty
+        :param b_empty: yield rows_b if rows_a is empty
+        """
+        mat_rows_b = rows_b if isinstance(rows_b, list) else list(rows_b)
+        if not mat_rows_b:
+            if a_empty:
+                yield from rows_a
+            return
+
+        b_columns = mat_rows_b[0].keys()
+        if len(mat_rows_b) > 1 and any(b_row.keys() != b_columns for b_row in mat_rows_b):
+            flag_b = True
+            for a_row in rows_a:
+                flag_b = False
+                for b_row in mat_rows_b:
+                    yield self._merge(a_row, b_row, keys)
+            if flag_b and b_empty:
+                yield from mat_rows_b
+            return
+
+        a_columns: tp.KeysView[str] | None = None
+        collisions: tp.AbstractSet[str] = frozenset()
+        renamed_b: list[TRow] | None = mat_rows_b
         flag_b = True
         for a_row in rows_a:
-            for b_row in mat_rows_b:
-                flag_b = False
-                if all(a_row[i] == b_row[i] for i in keys):
-                    row = dict()
-                    for key, value in (a_row | b_row).items():
-                        if key in a_row and key in b_row and key not in keys:
-                            row[key + self._a_suffix] = a_row[key]
-                            row[key + self._b_suffix] = b_row[key]
-                        else:
-                            row[key] = value
-                    yield row
+            flag_b = False
+            if a_row.keys() != a_columns:
+                a_columns = a_row.keys()
+                collisions = (a_columns & b_columns).difference(keys)
+                if not collisions:
+                    renamed_b = mat_rows_b
+                elif len(mat_rows_b) <= RENAMED_ROWS_LIMIT:
+                    renamed_b = [self._rename(b_row, collisions, self._b_suffix) for b_row in mat_rows_b]
+                else:
+                    renamed_b = None
+            if collisions:
+                a_row = self._rename(a_row, collisions, self._a_suffix)
+            if renamed_b is None:
+                for b_row in mat_rows_b:
+                    yield a_row | self._rename(b_row, collisions, self._b_suffix)
+                continue
+            for b_row in renamed_b:
+                yield a_row | b_row
 
         if flag_b and b_empty:
             yield from mat_rows_b
@@ -121,14 +828,27 @@ class Joiner(ABC):
 
 
 class Join(Operation):
+    kind = 'Join'
+
     def __init__(self, joiner: Joiner, keys: tp.Sequence[str]):
         self.keys = keys
         self.joiner = joiner
 
+    def output_order(self, input_orders: tp.Sequence[TOrder]) -> TOrder:
+        """Groups are joined in order of keys, rows of group keep order of the left input if joiner allows it"""
+        left_order = input_orders[0]
+        if left_order[:len(self.keys)] != tuple(self.keys):
+            return ()
+        return self.joiner.preserved_order(self.keys, left_order)
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.joiner.required_columns(self.keys, columns)
+
     def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
         other_rows = args[0]
-        rows_iter = itertools.groupby(rows, lambda x: tuple(x[i] for i in self.keys))
-        other_rows_iter = itertools.groupby(other_rows, lambda x: tuple(x[i] for i in self.keys))
+        key = _key_getter(self.keys)
+        rows_iter = itertools.groupby(rows, key)
+        other_rows_iter = itertools.groupby(other_rows, key)
         try:
             for (value, group) in rows_iter:
                 for (other_value, other_group) in other_rows_iter:
@@ -150,6 +870,62 @@ class Join(Operation):
                 yield from self.joiner(self.keys, [], i)
 
 
+class HashJoin(Operation):
+    """
+    Join which does not require sorted inputs. Both inputs are read in turn until one of them ends,
+    the ended (smaller) one is put into hash table by keys and the other one is streamed through it.
+    """
+    kind = 'Join'
+
+    def __init__(self, joiner: Joiner, keys: tp.Sequence[str]):
+        self.keys = keys
+        self.joiner = joiner
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return self.joiner.required_columns(self.keys, columns)
+
+    def __call__(self, rows: TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> TRowsGenerator:
+        rows_iter = iter(rows)
+        other_rows_iter = iter(args[0])
+        buffer: list[TRow] = []
+        other_buffer: list[TRow] = []
+        while True:
+            row = next(rows_iter, None)
+            if row is None:
+                yield from self._join_streamed(buffer, itertools.chain(other_buffer, other_rows_iter), True)
+                return
+            buffer.append(row)
+            other_row = next(other_rows_iter, None)
+            if other_row is None:
+                yield from self._join_streamed(other_buffer, itertools.chain(buffer, rows_iter), False)
+                return
+            other_buffer.append(other_row)
+
+    def _join_streamed(self, table_rows: list[TRow], streamed_rows: TRowsIterable,
+                       table_is_left: bool) -> TRowsGenerator:
+        key = _key_getter(self.keys)
+        table: dict[tp.Any, list[TRow]] = defaultdict(list)
+        for row in table_rows:
+            table[key(row)].append(row)
+        table_rows.clear()
+        matched = set()
+        for row in streamed_rows:
+            value = key(row)
+            group = table.get(value, [])
+            if group:
+                matched.add(value)
+            if table_is_left:
+                yield from self.joiner(self.keys, group, [row])
+            else:
+                yield from self.joiner(self.keys, [row], group)
+        for value, group in table.items():
+            if value not in matched:
+                if table_is_left:
+                    yield from self.joiner(self.keys, group, [])
+                else:
+                    yield from self.joiner(self.keys, [], group)
+
+
 # Dummy operators
 
 
@@ -159,6 +935,18 @@ class DummyMapper(Mapper):
     def __call__(self, row: TRow) -> TRowsGenerator:
         yield row
 
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        yield batch
+
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return columns
+
+    def changed_columns(self) -> TColumns:
+        return set()
+
 
 class FirstReducer(Reducer):
     """Yield only first row from passed ones"""
@@ -168,22 +956,45 @@ class FirstReducer(Reducer):
             yield row
             break
 
+    def reduce_batch(self, group_key: tuple[str, ...], batch: Batch) -> TBatchesGenerator:
+        yield Batch({name: values[:1] for name, values in batch.columns.items()}, min(batch.size, 1))
+
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns) | set(group_key)
+
 
 # Mappers
 
 class LambdaMapper(Mapper):
     """Map rows using passed function"""
-    def __init__(self, function: tp.Callable[[tp.Dict[str, tp.Any]], tp.Iterable[tp.Dict[str, tp.Any]]]):
+    def __init__(self, function: tp.Callable[[tp.Dict[str, tp.Any]], tp.Iterable[tp.Dict[str, tp.Any]]],
+                 reads: tp.Sequence[str] | None = None, writes: tp.Sequence[str] = ()):
         """
         :param function: function to map row. Take row, return iterable of rows
+        :param reads: columns function reads, if it passes all the other columns through unchanged;
+            None if unknown (then columns are never pruned before this mapper)
+        :param writes: columns function adds or replaces
         """
         self.f = function
+        self.reads = reads
+        self.writes = writes
 
     def __call__(self, row: TRow) -> TRowsGenerator:
         res = self.f(row)
         for i in res:
             yield i
 
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return () if self.reads is None else order_before(order, self.writes)
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        if self.reads is None or columns is None:
+            return None
+        return set(columns).difference(self.writes) | set(self.reads)
+
+    def changed_columns(self) -> TColumns:
+        return None if self.reads is None else set(self.writes)
+
 
 class Haversine(Mapper):
     """Find distance between two points using haversine function"""
@@ -197,19 +1008,55 @@ class Haversine(Mapper):
         self.end = end_coord_column
         self.result = result_column
 
-    def __call__(self, row: TRow) -> TRowsGenerator:
+    @staticmethod
+    def _distance(start: tp.Sequence[float], end: tp.Sequence[float]) -> float:
         r = 6373
-        lambda1, phi1 = row[self.start]
-        lambda2, phi2 = row[self.end]
+        lambda1, phi1 = start
+        lambda2, phi2 = end
         lambda1, phi1 = radians(lambda1), radians(phi1)
         lambda2, phi2 = radians(lambda2), radians(phi2)
         h = ((sin((phi2 - phi1) / 2)) ** 2) + (cos(phi1) * cos(phi2) * ((sin((lambda2 - lambda1) / 2)) ** 2))
-        yield row | {self.result: 2 * r * asin(sqrt(h))}
+        return 2 * r * asin(sqrt(h))
+
+    def __call__(self, row: TRow) -> TRowsGenerator:
+        yield row | {self.result: self._distance(row[self.start], row[self.end])}
+
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_before(order, [self.result])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns).difference([self.result]) | {self.start, self.end}
+
+    def changed_columns(self) -> TColumns:
+        return {self.result}
+
+    @staticmethod
+    def _coordinates(points: tp.Sequence[tp.Sequence[float]]) -> tp.Any:
+        """Array of shape (len(points), 2); filled from flat iterator, which is much faster than from nested lists"""
+        flat = itertools.chain.from_iterable(points)
+        return np.fromiter(flat, dtype=float, count=2 * len(points)).reshape(-1, 2)
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        """Distances of the whole batch are computed with NumPy array math if NumPy is installed"""
+        if np is None or batch.size == 0:
+            result = [self._distance(start, end)
+                      for start, end in zip(batch.columns[self.start], batch.columns[self.end])]
+            yield Batch(batch.columns | {self.result: result}, batch.size)
+            return
+        r = 6373
+        start = np.radians(self._coordinates(batch.columns[self.start]))
+        end = np.radians(self._coordinates(batch.columns[self.end]))
+        lambda1, phi1 = start[:, 0], start[:, 1]
+        lambda2, phi2 = end[:, 0], end[:, 1]
+        h = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lambda2 - lambda1) / 2) ** 2
+        yield Batch(batch.columns | {self.result: (2 * r * np.arcsin(np.sqrt(h))).tolist()}, batch.size)
 
 
 class FilterPunctuation(Mapper):
     """Left only non-punctuation symbols"""
 
+    _punctuation = str.maketrans('', '', r'!“”"‘’#$%&\'()*+,-./:;<=>?@[\]^_`{|}~')
+
     def __init__(self, column: str):
         """
         :param column: name of column to process
@@ -217,10 +1064,22 @@ class FilterPunctuation(Mapper):
         self.column = column
 
     def __call__(self, row: TRow) -> TRowsGenerator:
-        row[self.column] = str.translate(row[self.column],
-                                         str.maketrans('', '', r'!“”"‘’#$%&\'()*+,-./:;<=>?@[\]^_`{|}~'))
+        row[self.column] = row[self.column].translate(self._punctuation)
         yield row
 
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_before(order, [self.column])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns) | {self.column}
+
+    def changed_columns(self) -> TColumns:
+        return {self.column}
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        values = [text.translate(self._punctuation) for text in batch.columns[self.column]]
+        yield Batch(batch.columns | {self.column: values}, batch.size)
+
 
 class LowerCase(Mapper):
     """Replace column value with value in lower case"""
@@ -239,22 +1098,68 @@ class LowerCase(Mapper):
         row[self.column] = LowerCase._lower_case(row[self.column])
         yield row
 
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_before(order, [self.column])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns) | {self.column}
+
+    def changed_columns(self) -> TColumns:
+        return {self.column}
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        values = [text.lower() for text in batch.columns[self.column]]
+        yield Batch(batch.columns | {self.column: values}, batch.size)
+
+
+WHITESPACE = r"\s+"
+
 
 class Split(Mapper):
     """Split row on multiple rows by separator"""
 
-    def __init__(self, column: str, separator: str | None = r"\s+") -> None:
+    def __init__(self, column: str, separator: str | None = WHITESPACE) -> None:
         """
         :param column: name of column to split
-        :param separator: string to separate by
+        :param separator: regular expression to separate by, None means whitespace
         """
         self.column = column
-        self.separator = separator
+        self.separator = WHITESPACE if separator is None else separator
+        self._pattern = re.compile(f'(?:^|{self.separator})((?:(?!{self.separator}).)*)')
+        self._whitespace = self.separator == WHITESPACE
+
+    def _fragments(self, text: str) -> list[str]:
+        if not self._whitespace:
+            return [match.group(1) for match in self._pattern.finditer(text)]
+        # str.split gives the same fragments as the pattern does, except for empty ones at the edges
+        fragments = text.split()
+        if not text or text[0].isspace():
+            fragments.insert(0, '')
+        if text and text[-1].isspace():
+            fragments.append('')
+        return fragments
 
     def __call__(self, row: TRow) -> TRowsGenerator:
-        for match in re.finditer(f'(?:^|{self.separator})((?:(?!{self.separator}).)*)', row[self.column]):
-            fragment = match.group(1)
-            yield row.copy() | {self.column: fragment}
+        for fragment in self._fragments(row[self.column]):
+            yield row | {self.column: fragment}
+
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_before(order, [self.column])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns) | {self.column}
+
+    def changed_columns(self) -> TColumns:
+        return {self.column}
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        fragments = [self._fragments(text) for text in batch.columns[self.column]]
+        counts = [len(row_fragments) for row_fragments in fragments]
+        columns: dict[str, tp.Sequence[tp.Any]] = {
+            name: list(itertools.chain.from_iterable(map(itertools.repeat, values, counts)))
+            for name, values in batch.columns.items() if name != self.column}
+        columns[self.column] = list(itertools.chain.from_iterable(fragments))
+        yield Batch(columns, sum(counts))
 
 
 class Product(Mapper):
@@ -275,20 +1180,55 @@ class Product(Mapper):
         row[self.result_column] = ans
         yield row
 
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_before(order, [self.result_column])
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        if columns is None:
+            return None
+        return set(columns).difference([self.result_column]) | set(self.columns)
+
+    def changed_columns(self) -> TColumns:
+        return {self.result_column}
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        values: list[tp.Any] = [1] * batch.size
+        for column in self.columns:
+            values = [value * other for value, other in zip(values, batch.columns[column])]
+        yield Batch(batch.columns | {self.result_column: values}, batch.size)
+
 
 class Filter(Mapper):
     """Remove records that don't satisfy some condition"""
 
-    def __init__(self, condition: tp.Callable[[TRow], bool]) -> None:
+    def __init__(self, condition: tp.Callable[[TRow], bool], reads: tp.Sequence[str] | None = None) -> None:
         """
         :param condition: if condition is not true - remove record
+        :param reads: columns condition reads, None if unknown (then columns are never pruned before filter)
         """
         self.condition = condition
+        self.reads = reads
 
     def __call__(self, row: TRow) -> TRowsGenerator:
         if self.condition(row):
             yield row
 
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        selectors = [bool(self.condition(row)) for row in batch.rows()]
+        yield Batch({name: list(itertools.compress(values, selectors)) for name, values in batch.columns.items()},
+                    sum(selectors))
+
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order
+
+    def output_columns(self, columns: TColumns) -> TColumns:
+        return columns
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        if self.reads is None or columns is None:
+            return None
+        return set(columns) | set(self.reads)
+
 
 class Project(Mapper):
     """Leave only mentioned columns"""
@@ -302,6 +1242,18 @@ class Project(Mapper):
     def __call__(self, row: TRow) -> TRowsGenerator:
         yield {key: row[key] for key in self.columns}
 
+    def preserved_order(self, order: TOrder) -> TOrder:
+        return order_within(order, self.columns)
+
+    def output_columns(self, columns: TColumns) -> TColumns:
+        return set(self.columns)
+
+    def required_columns(self, columns: TColumns) -> TColumns:
+        return set(self.columns)
+
+    def map_batch(self, batch: Batch) -> TBatchesGenerator:
+        yield Batch({key: batch.columns[key] for key in self.columns}, batch.size)
+
 
 # Reducers
 
@@ -331,6 +1283,9 @@ class TopN(Reducer):
         for i in reversed(arr):
             yield dict(i)
 
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return None if columns is None else set(columns) | set(group_key) | {self.column_max}
+
 
 class TermFrequency(Reducer):
     """Calculate frequency of values in column"""
@@ -361,8 +1316,14 @@ class TermFrequency(Reducer):
                    {self.result_column: group_size / size} |
                    {self.words_column: value})
 
+    def output_columns(self, group_key: tuple[str, ...]) -> TColumns:
+        return set(group_key) | {self.result_column, self.words_column}
+
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return set(group_key) | {self.words_column}
 
-class Mean(Reducer):
+
+class Mean(CombinableReducer):
     """Calculate mean of values in column"""
 
     def __init__(self, words_column: str, result_column: str = 'mean') -> None:
@@ -383,8 +1344,28 @@ class Mean(Reducer):
             size += 1
         yield {key: main_part[key] for key in group_key} | {self.result_column: group_sum / size}
 
+    def reduce_batch(self, group_key: tuple[str, ...], batch: Batch) -> TBatchesGenerator:
+        columns = {key: batch.columns[key][-1:] for key in group_key}
+        columns[self.result_column] = [sum(batch.columns[self.words_column]) / batch.size]
+        yield Batch(columns, 1)
+
+    def partial(self, row: TRow) -> tuple[tp.Any, int]:
+        return row[self.words_column], 1
 
-class Count(Reducer):
+    def merge(self, state: tuple[tp.Any, int], other_state: tuple[tp.Any, int]) -> tuple[tp.Any, int]:
+        return state[0] + other_state[0], state[1] + other_state[1]
+
+    def finalize(self, group_key: tuple[str, ...], row: TRow, state: tuple[tp.Any, int]) -> TRowsGenerator:
+        yield {key: row[key] for key in group_key} | {self.result_column: state[0] / state[1]}
+
+    def output_columns(self, group_key: tuple[str, ...]) -> TColumns:
+        return set(group_key) | {self.result_column}
+
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return set(group_key) | {self.words_column}
+
+
+class Count(CombinableReducer):
     """
     Count records by key
     Example for group_key=('a',) and column='d'
@@ -408,8 +1389,28 @@ class Count(Reducer):
             value = row
         yield {key: value[key] for key in group_key} | {self.column: size}
 
+    def reduce_batch(self, group_key: tuple[str, ...], batch: Batch) -> TBatchesGenerator:
+        columns = {key: batch.columns[key][-1:] for key in group_key}
+        columns[self.column] = [batch.size]
+        yield Batch(columns, 1)
+
+    def partial(self, row: TRow) -> int:
+        return 1
+
+    def merge(self, state: int, other_state: int) -> int:
+        return state + other_state
+
+    def finalize(self, group_key: tuple[str, ...], row: TRow, state: int) -> TRowsGenerator:
+        yield {key: row[key] for key in group_key} | {self.column: state}
+
+    def output_columns(self, group_key: tuple[str, ...]) -> TColumns:
+        return set(group_key) | {self.column}
 
-class Sum(Reducer):
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return set(group_key)
+
+
+class Sum(CombinableReducer):
     """
     Sum values aggregated by key
     Example for key=('a',) and column='b'
@@ -433,31 +1434,72 @@ class Sum(Reducer):
             value = row
         yield {key: value[key] for key in group_key} | {self.column: size}
 
+    def reduce_batch(self, group_key: tuple[str, ...], batch: Batch) -> TBatchesGenerator:
+        columns = {key: batch.columns[key][-1:] for key in group_key}
+        columns[self.column] = [sum(batch.columns[self.column])]
+        yield Batch(columns, 1)
+
+    def partial(self, row: TRow) -> tp.Any:
+        return row[self.column]
+
+    def merge(self, state: tp.Any, other_state: tp.Any) -> tp.Any:
+        return state + other_state
+
+    def finalize(self, group_key: tuple[str, ...], row: TRow, state: tp.Any) -> TRowsGenerator:
+        yield {key: row[key] for key in group_key} | {self.column: state}
+
+    def output_columns(self, group_key: tuple[str, ...]) -> TColumns:
+        return set(group_key) | {self.column}
+
+    def required_columns(self, group_key: tuple[str, ...], columns: TColumns) -> TColumns:
+        return set(group_key) | {self.column}
+
 
 # Joiners
 class InnerJoiner(Joiner):
     """Join with inner strategy"""
 
     def __call__(self, keys: tp.Sequence[str], rows_a: TRowsIterable, rows_b: TRowsIterable) -> TRowsGenerator:
-        yield from self._abs_joiner(False, False, keys, rows_a, rows_b)
+        return self._abs_joiner(False, False, keys, rows_a, rows_b)
+
+    def preserved_order(self, keys: tp.Sequence[str], order: TOrder) -> TOrder:
+        return self._left_order(keys, order)
+
+    def filtered_input(self, keys: tp.Sequence[str], reads: tp.Collection[str],
+                       input_columns: tp.Sequence[TColumns]) -> int | None:
+        """Input providing all columns filter reads under their own names (values of keys are equal in both)"""
+        columns_a, columns_b = input_columns
+        if columns_a is None or columns_b is None:
+            return None
+        collisions = (columns_a & columns_b) - set(keys)
+        renamed = {column + suffix for column in collisions for suffix in (self._a_suffix, self._b_suffix)}
+        if not renamed.isdisjoint(reads):
+            return None
+        for index, (columns, other) in enumerate([(columns_a, columns_b), (columns_b, columns_a)]):
+            if set(reads) <= columns and other.isdisjoint(set(reads).difference(keys)):
+                return index
+        return None
 
 
 class OuterJoiner(Joiner):
     """Join with outer strategy"""
 
     def __call__(self, keys: tp.Sequence[str], rows_a: TRowsIterable, rows_b: TRowsIterable) -> TRowsGenerator:
-        yield from self._abs_joiner(True, True, keys, rows_a, rows_b)
+        return self._abs_joiner(True, True, keys, rows_a, rows_b)
 
 
 class LeftJoiner(Joiner):
     """Join with left strategy"""
 
     def __call__(self, keys: tp.Sequence[str], rows_a: TRowsIterable, rows_b: TRowsIterable) -> TRowsGenerator:
-        yield from self._abs_joiner(True, False, keys, rows_a, rows_b)
+        return self._abs_joiner(True, False, keys, rows_a, rows_b)
+
+    def preserved_order(self, keys: tp.Sequence[str], order: TOrder) -> TOrder:
+        return self._left_order(keys, order)
 
 
 class RightJoiner(Joiner):
     """Join with right strategy"""
 
     def __call__(self, keys: tp.Sequence[str], rows_a: TRowsIterable, rows_b: TRowsIterable) -> TRowsGenerator:
-        yield from self._abs_joiner(False, True, keys, rows_a, rows_b)
+        return self._abs_joiner(False, True, keys, rows_a, rows_b)
@@ -0,0 +1,246 @@
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import os
+import tempfile
+import typing as tp
+
+from multiprocessing import Pipe, Process, connection
+
+from . import compression
+from . import operations as ops
+from .parsers import Parser
+from .external_sort import (DEFAULT_CHUNK_SIZE, DEFAULT_MEMORY_LIMIT, recv_rows, recv_sized_rows, send_rows,
+                            sort_key, sorted_runs)
+
+_worker_mapper: ops.Mapper | None = None
+
+
+def _init_map_worker(mapper: ops.Mapper) -> None:
+    global _worker_mapper
+    _worker_mapper = mapper
+
+
+def _map_chunk(chunk: list[ops.TRow]) -> list[ops.TRow]:
+    assert _worker_mapper is not None
+    return [result for row in chunk for result in _worker_mapper(row)]
+
+
+def _next_done(pending: collections.deque[concurrent.futures.Future[list[ops.TRow]]], ordered: bool) -> list[ops.TRow]:
+    """Result of the first pending future if ordered, otherwise of any completed one (it is removed from pending)"""
+    if ordered:
+        return pending.popleft().result()
+    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+    future = done.pop()
+    pending.remove(future)
+    return future.result()
+
+
+def chunked(rows: ops.TRowsIterable, chunk_size: int) -> tp.Iterator[list[ops.TRow]]:
+    """Split rows into lists of chunk_size rows (the last one may be shorter)"""
+    rows_iter = iter(rows)
+    return iter(lambda: list(itertools.islice(rows_iter, chunk_size)), [])
+
+
+class ParallelMap(ops.Operation):
+    """
+    Map rows in pool of worker processes. Rows are sent to workers in chunks, at most two chunks per worker
+    are in flight, so memory stays bounded.
+    Workers are forked, so mapper doesn't have to be picklable (lambdas and closures are fine), rows do.
+    """
+    kind = 'Map'
+
+    def __init__(self, mapper: ops.Mapper, workers: int, ordered: bool = True, chunk_size: int = 1000) -> None:
+        """
+        :param mapper: mapper to use
+        :param workers: number of worker processes
+        :param ordered: keep order of rows; otherwise chunks are yielded as soon as they are ready
+        :param chunk_size: number of rows sent to worker at once
+        """
+        self.mapper = mapper
+        self.workers = self.processes = workers
+        self.ordered = ordered
+        self.chunk_size = chunk_size
+
+    def __call__(self, rows: ops.TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
+        with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'),
+                                                    initializer=_init_map_worker,
+                                                    initargs=(self.mapper,)) as pool:
+            pending: collections.deque[concurrent.futures.Future[list[ops.TRow]]] = collections.deque()
+            for chunk in chunked(rows, self.chunk_size):
+                if len(pending) >= 2 * self.workers:
+                    yield from _next_done(pending, self.ordered)
+                pending.append(pool.submit(_map_chunk, chunk))
+            while pending:
+                yield from _next_done(pending, self.ordered)
+
+    def output_order(self, input_orders: tp.Sequence[ops.TOrder]) -> ops.TOrder:
+        return self.mapper.preserved_order(input_orders[0]) if self.ordered else ()
+
+    def output_columns(self, input_columns: tp.Sequence[ops.TColumns]) -> ops.TColumns:
+        return self.mapper.output_columns(input_columns[0])
+
+    def required_columns(self, columns: ops.TColumns) -> ops.TColumns:
+        return self.mapper.required_columns(columns)
+
+
+DEFAULT_RANGE_SIZE = 4 * 1024 * 1024
+
+_worker_file: mmap.mmap | None = None
+_worker_parser: tp.Callable[[str], ops.TRow] | None = None
+
+
+def _init_read_worker(filename: str, parser: tp.Callable[[str], ops.TRow]) -> None:
+    global _worker_file, _worker_parser
+    with open(filename, 'rb') as f:
+        _worker_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_parser = parser
+
+
+def _read_range(start: int, end: int) -> list[ops.TRow]:
+    assert _worker_file is not None and _worker_parser is not None
+    lines = _worker_file[start:end].decode().split('\n')
+    if not lines[-1]:
+        lines.pop()
+    if isinstance(_worker_parser, Parser):
+        return _worker_parser.parse_batch(lines)
+    return [_worker_parser(line) for line in lines]
+
+
+def line_ranges(data: mmap.mmap, range_size: int) -> tp.Generator[tuple[int, int], None, None]:
+    """Split data into ranges [start, end) of about range_size bytes, every range but the last ends with newline"""
+    start = 0
+    while start < len(data):
+        newline = data.find(b'\n', min(start + range_size, len(data)) - 1)
+        end = len(data) if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+class ParallelRead(ops.Operation):
+    """
+    Read rows from file in pool of worker processes: file is memory-mapped and split into newline-aligned
+    ranges of bytes, every worker parses whole ranges (see ops.Read for parsers). At most two ranges per worker
+    are in flight, so memory stays bounded.
+    Workers are forked, so parser doesn't have to be picklable, rows do. Rows are pickled on their way back,
+    so it pays off for parsers slower than unpickling (ast.literal_eval, values converted by CsvParser)
+    given enough cores; JSON lines are usually read faster by ops.Read.
+    """
+    kind = 'Read'
+
+    def __init__(self, filename: str, parser: tp.Callable[[str], ops.TRow], workers: int, ordered: bool = True,
+                 range_size: int = DEFAULT_RANGE_SIZE) -> None:
+        """
+        :param filename: filename to read from
+        :param parser: parser from string to Row
+        :param workers: number of worker processes
+        :param ordered: keep order of rows in file; otherwise ranges are yielded as soon as they are parsed
+        :param range_size: approximate number of bytes parsed by worker at once
+        """
+        if compression.detect(filename) is not None:
+            raise ValueError(f'{filename} is compressed, it can be read without workers only')
+        self.filename = filename
+        self.parser = parser
+        self.workers = self.processes = workers
+        self.ordered = ordered
+        self.range_size = range_size
+
+    def __call__(self, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
+        if os.path.getsize(self.filename) == 0:
+            return
+        with open(self.filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            parser = self.parser
+            if isinstance(parser, Parser):
+                parser = parser.detect(data[:data.find(b'\n') + 1 or len(data)].decode())
+            with concurrent.futures.ProcessPoolExecutor(self.workers,
+                                                        mp_context=multiprocessing.get_context('fork'),
+                                                        initializer=_init_read_worker,
+                                                        initargs=(self.filename, parser)) as pool:
+                pending: collections.deque[concurrent.futures.Future[list[ops.TRow]]] = collections.deque()
+                for start, end in line_ranges(data, self.range_size):
+                    if len(pending) >= 2 * self.workers:
+                        yield from _next_done(pending, self.ordered)
+                    pending.append(pool.submit(_read_range, start, end))
+                while pending:
+                    yield from _next_done(pending, self.ordered)
+
+
+def _sort_reduce_worker(endpoint: connection.Connection, reduce: ops.Reduce, memory_limit: int,
+                        chunk_size: int) -> None:
+    with tempfile.TemporaryDirectory(prefix='compgraph_reduce_') as directory:
+        rows = sorted_runs(recv_sized_rows(endpoint), reduce.keys, memory_limit, directory)
+        send_rows(endpoint, reduce(rows), chunk_size)
+
+
+class PartitionedReduce(ops.Operation):
+    """
+    Reduce rows in several worker processes (local shuffle): rows are hash-partitioned by keys between workers,
+    every worker sorts its partition (with bounded memory, like ExternalSort) and reduces it.
+    Input doesn't have to be sorted. With ordered=True results of workers are merged by keys, so reducer
+    has to keep keys columns in result rows; otherwise results are concatenated.
+    """
+    kind = 'Reduce'
+
+    def __init__(self, reducer: ops.Reducer, keys: tp.Sequence[str], workers: int, ordered: bool = True,
+                 combined: bool = False, memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        :param reducer: reducer to use
+        :param keys: keys for grouping
+        :param workers: number of worker processes (partitions)
+        :param ordered: whether result has to be sorted by keys
+        :param combined: whether rows are partial states produced by Combine with the same reducer
+        :param memory_limit: approximate amount of memory (in bytes) for rows held by every worker
+        :param chunk_size: number of rows transferred to and from workers at once
+        """
+        self.reduce = ops.Reduce(reducer, keys, combined)
+        self.reducer = reducer
+        self.keys = keys
+        self.workers = self.processes = workers
+        self.ordered = ordered
+        self.memory_limit = memory_limit
+        self.chunk_size = chunk_size
+
+    def __call__(self, rows: ops.TRowsIterable, *args: tp.Any, **kwargs: tp.Any) -> ops.TRowsGenerator:
+        endpoints = []
+        processes = []
+        for _ in range(self.workers):
+            local_endpoint, remote_endpoint = Pipe()
+            process = Process(target=_sort_reduce_worker,
+                              args=(remote_endpoint, self.reduce, self.memory_limit, self.chunk_size))
+            process.start()
+            endpoints.append(local_endpoint)
+            processes.append(process)
+
+        key = sort_key(self.keys)
+        partitions: list[list[ops.TRow]] = [[] for _ in range(self.workers)]
+        for row in rows:
+            index = hash(key(row)) % self.workers
+            partitions[index].append(row)
+            if len(partitions[index]) >= self.chunk_size:
+                endpoints[index].send(partitions[index])
+                partitions[index] = []
+        for endpoint, partition in zip(endpoints, partitions):
+            if partition:
+                endpoint.send(partition)
+            endpoint.send(None)
+
+        results = [recv_rows(endpoint) for endpoint in endpoints]
+        if self.ordered:
+            yield from heapq.merge(*results, key=key)
+        else:
+            yield from itertools.chain.from_iterable(results)
+        for process in processes:
+            process.join()
+
+    def output_order(self, input_orders: tp.Sequence[ops.TOrder]) -> ops.TOrder:
+        return tuple(self.keys) if self.ordered else ()
+
+    def output_columns(self, input_columns: tp.Sequence[ops.TColumns]) -> ops.TColumns:
+        return self.reduce.output_columns(input_columns)
+
+    def required_columns(self, columns: ops.TColumns) -> ops.TColumns:
+        return self.reduce.required_columns(columns)
@@ -0,0 +1,152 @@
+import ast
+import csv
+import json
+import typing as tp
+from abc import ABC, abstractmethod
+
+try:
+    import orjson  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+TRow = dict[str, tp.Any]
+TColumnTypes = tp.Mapping[str, tp.Callable[[str], tp.Any]]
+TParser = tp.Callable[[str], TRow] | str
+
+
+class Parser(ABC):
+    """Base class for parsers of lines of text files into rows"""
+
+    @abstractmethod
+    def __call__(self, line: str) -> TRow:
+        """
+        :param line: one line of file (may end with newline)
+        """
+        pass
+
+    def parse_batch(self, lines: list[str]) -> list[TRow]:
+        """Parse several lines at once. By default lines are parsed one by one, parsers override it when faster"""
+        return [self(line) for line in lines]
+
+    def detect(self, first_line: str) -> 'Parser':
+        """Parser to parse file starting with first_line with (parsers choosing format by data override it)"""
+        return self
+
+
+class LiteralParser(Parser):
+    """Lines are Python literals (as printed by print(row)), parsed with ast.literal_eval"""
+
+    def __call__(self, line: str) -> TRow:
+        return tp.cast(TRow, ast.literal_eval(line))
+
+
+_decode: tp.Callable[[str], tp.Any] = json.JSONDecoder().decode if orjson is None else orjson.loads
+
+
+class JsonParser(Parser):
+    """
+    Lines are JSON objects. orjson is used if installed, otherwise decoder of json module is reused for all lines;
+    batch of lines is decoded as one JSON array
+    """
+
+    def __init__(self, fallback: tp.Callable[[str], TRow] | None = None) -> None:
+        """
+        :param fallback: parser of lines which are not valid JSON (they are errors if None)
+        """
+        self.fallback = fallback
+
+    def __call__(self, line: str) -> TRow:
+        if self.fallback is None:
+            return tp.cast(TRow, _decode(line))
+        try:
+            return tp.cast(TRow, _decode(line))
+        except ValueError:
+            return self.fallback(line)
+
+    def parse_batch(self, lines: list[str]) -> list[TRow]:
+        try:
+            return tp.cast(list[TRow], _decode('[' + ','.join(lines) + ']'))
+        except ValueError:
+            return [self(line) for line in lines]
+
+
+class CsvParser(Parser):
+    """Lines are delimited values of declared columns, values are converted with types of columns if given"""
+
+    def __init__(self, columns: tp.Sequence[str] | TColumnTypes, delimiter: str = ',') -> None:
+        """
+        :param columns: names of columns in order, or mapping from names to converters of values (e.g. int)
+        :param delimiter: delimiter of values (',' for CSV, '\\t' for TSV)
+        """
+        self.columns = tuple(columns)
+        self.types = dict(columns) if isinstance(columns, tp.Mapping) else None
+        self.delimiter = delimiter
+
+    def _row(self, values: list[str]) -> TRow:
+        if self.types is None:
+            return dict(zip(self.columns, values))
+        return {column: self.types[column](value) for column, value in zip(self.columns, values)}
+
+    def __call__(self, line: str) -> TRow:
+        return self._row(next(csv.reader([line], delimiter=self.delimiter)))
+
+    def parse_batch(self, lines: list[str]) -> list[TRow]:
+        return [self._row(values) for values in csv.reader(lines, delimiter=self.delimiter)]
+
+
+class AutoParser(Parser):
+    """
+    Format is detected by the first line of file: JSON lines if it is valid JSON (lines which are not
+    are parsed with ast.literal_eval), Python literals if it starts with '{', otherwise delimited values
+    of declared columns (tab-separated if the first line has tabs)
+    """
+
+    def __init__(self, columns: tp.Sequence[str] | TColumnTypes | None = None) -> None:
+        """
+        :param columns: columns of delimited values (see CsvParser)
+        """
+        self.columns = columns
+
+    def __call__(self, line: str) -> TRow:
+        return self.detect(line)(line)
+
+    def detect(self, first_line: str) -> Parser:
+        try:
+            if isinstance(json.loads(first_line), dict):
+                return JsonParser(fallback=ast.literal_eval)
+        except ValueError:
+            pass
+        if first_line.lstrip().startswith('{'):
+            return LiteralParser()
+        if self.columns is None:
+            raise ValueError('columns have to be declared to parse delimited values')
+        return CsvParser(self.columns, '\t' if '\t' in first_line else ',')
+
+
+PARSERS: dict[str, tp.Callable[..., Parser]] = {
+    'auto': AutoParser,
+    'json': JsonParser,
+    'literal': LiteralParser,
+    'csv': CsvParser,
+    'tsv': lambda columns: CsvParser(columns, '\t'),
+}
+
+
+def register_parser(name: str, factory: tp.Callable[..., Parser]) -> None:
+    """
+    Make parser available by name
+    :param name: name of parser
+    :param factory: class of parser or function building it from options
+    """
+    PARSERS[name] = factory
+
+
+def get_parser(name: str, **options: tp.Any) -> Parser:
+    """
+    Build parser registered with name
+    :param name: one of PARSERS
+    :param options: arguments of parser (e.g. columns for 'csv')
+    """
+    if name not in PARSERS:
+        raise ValueError(f'unknown parser {name!r}, known are {sorted(PARSERS)}')
+    return PARSERS[name](**options)
@@ -0,0 +1,378 @@
+import itertools
+import pickle
+import tempfile
+import typing as tp
+
+from . import operations as ops
+from .external_sort import ExternalSort, Presorted
+
+if tp.TYPE_CHECKING:
+    from .profiling import Profiler
+
+BATCHED_OPERATIONS = (ops.BatchMap, ops.BatchReduce)
+PRUNED_OPERATIONS = (ExternalSort, ops.Join, ops.HashJoin)
+
+
+class Step:
+    """
+    One operation added to graph, linked to steps producing its inputs: the previous step of its graph
+    goes first, last steps of other consumed graphs follow. Steps are never changed once created,
+    so graphs built from the same graph share its steps (equal steps mean the same part of computation)
+    """
+
+    def __init__(self, operation: ops.Operation, inputs: tp.Sequence['Step'] = ()) -> None:
+        """
+        :param operation: operation to apply
+        :param inputs: steps producing inputs of operation
+        """
+        self.operation = operation
+        self.inputs = tuple(inputs)
+
+
+class Node:
+    """Node of execution DAG: operation applied to outputs of input nodes"""
+
+    def __init__(self, operation: ops.Operation, inputs: list['Node']) -> None:
+        self.operation = operation
+        self.inputs = inputs
+        self.consumers = 0
+
+
+def build(step: Step) -> Node:
+    """
+    Build execution DAG for graph ending with given step: steps shared by several graphs become one node
+    :return: node producing graph result
+    """
+    nodes: dict[int, Node] = dict()
+    pending = [step]
+    while pending:
+        current = pending[-1]
+        if id(current) in nodes:
+            pending.pop()
+            continue
+        missing = [input_step for input_step in current.inputs if id(input_step) not in nodes]
+        if missing:
+            pending.extend(missing)
+            continue
+        pending.pop()
+        nodes[id(current)] = Node(current.operation, [nodes[id(input_step)] for input_step in current.inputs])
+
+    root = nodes[id(step)]
+    count_consumers(root)
+    return root
+
+
+def count_consumers(root: Node) -> None:
+    """Set number of consumers of every node of DAG"""
+    nodes = topological_order(root)
+    for node in nodes:
+        node.consumers = 0
+    for node in nodes:
+        for input_node in node.inputs:
+            input_node.consumers += 1
+
+
+def topological_order(root: Node) -> list[Node]:
+    """Nodes of DAG ordered so that every node goes before its inputs"""
+    order: list[Node] = []
+    visited = set()
+
+    def visit(node: Node) -> None:
+        if id(node) in visited:
+            return
+        visited.add(id(node))
+        for input_node in node.inputs:
+            visit(input_node)
+        order.append(node)
+
+    visit(root)
+    return order[::-1]
+
+
+def push_filters(root: Node) -> None:
+    """
+    Move filters ahead of operations which do not change columns they read, so fewer rows are sorted, mapped
+    and joined: ahead of sorts (filtering does not depend on order of rows), of mappers passing these columns
+    through unchanged (see changed_columns of mappers) and into the input of join providing them (see
+    filtered_input of joiners). Filters which do not declare columns they read are moved ahead of sorts only
+    """
+    order = topological_order(root)
+    outputs: dict[int, ops.TColumns] = dict()
+    for node in reversed(order):
+        outputs[id(node)] = node.operation.output_columns([outputs[id(input_node)] for input_node in node.inputs])
+    for node in order:
+        while isinstance(node.operation, ops.Map) and isinstance(node.operation.mapper, ops.Filter):
+            input_node = node.inputs[0]
+            index = _filtered_input(node.operation.mapper, input_node, outputs)
+            if input_node.consumers > 1 or index is None:
+                break
+            # input node becomes the filter applied to one of its inputs, filter node becomes the operation
+            inputs = list(input_node.inputs)
+            input_node.inputs = [inputs[index]]
+            inputs[index] = input_node
+            node.inputs = inputs
+            node.operation, input_node.operation = input_node.operation, node.operation
+            outputs[id(input_node)] = outputs[id(input_node.inputs[0])]
+            node = input_node
+
+
+def _filtered_input(mapper: ops.Filter, node: Node, outputs: dict[int, ops.TColumns]) -> int | None:
+    """Index of input of node the filter may be applied to before node instead of after it"""
+    operation = node.operation
+    if isinstance(operation, ExternalSort):
+        return 0
+    if mapper.reads is None:
+        return None
+    if isinstance(operation, ops.Map):
+        changed = operation.mapper.changed_columns()
+        return None if changed is None or not changed.isdisjoint(mapper.reads) else 0
+    if isinstance(operation, (ops.Join, ops.HashJoin)):
+        input_columns = [outputs[id(input_node)] for input_node in node.inputs]
+        return operation.joiner.filtered_input(operation.keys, mapper.reads, input_columns)
+    return None
+
+
+def skip_sorts(root: Node) -> None:
+    """
+    Track keys output of every node is known to be sorted by (see output_order of operations)
+    and replace sorts of inputs already sorted by their keys with Presorted
+    """
+    orders: dict[int, ops.TOrder] = dict()
+    for node in reversed(topological_order(root)):
+        input_orders = [orders[id(input_node)] for input_node in node.inputs]
+        if isinstance(node.operation, ExternalSort):
+            keys = tuple(node.operation.keys)
+            if input_orders[0][:len(keys)] == keys:
+                node.operation = Presorted(node.operation, input_orders[0])
+        orders[id(node)] = node.operation.output_order(input_orders)
+
+
+class Stage:
+    """One node of physical plan as it will be executed"""
+
+    def __init__(self, number: int, node: Node, inputs: list[int]) -> None:
+        """
+        :param number: number of node in plan (inputs go first)
+        :param node: node of execution DAG
+        :param inputs: numbers of input nodes
+        """
+        operation = node.operation
+        self.number = number
+        self.kind = operation.kind
+        self.operation = operation
+        keys = getattr(operation, 'keys', None)
+        self.keys: list[str] | None = None if keys is None else list(keys)
+        self.inputs = inputs
+        self.consumers = node.consumers
+        self.processes = operation.processes
+
+    @property
+    def name(self) -> str:
+        """Name of operation with its source or mappers / reducer / joiner"""
+        operation = self.operation
+        parts = [type(mapper).__name__ for mapper in getattr(operation, 'mappers', ())]
+        for attribute in ('mapper', 'reducer', 'joiner'):
+            if hasattr(operation, attribute):
+                parts.append(type(getattr(operation, attribute)).__name__)
+        for attribute in ('filename', 'name'):
+            if isinstance(getattr(operation, attribute, None), str):
+                parts.append(repr(getattr(operation, attribute)))
+        if isinstance(operation, ops.Prune):
+            parts.append(f'columns={sorted(operation.columns)}')
+        if not parts:
+            return type(operation).__name__
+        return f'{type(operation).__name__}({", ".join(parts)})'
+
+    def __str__(self) -> str:
+        line = f'#{self.number} {self.kind}: {self.name}'
+        if self.keys is not None:
+            line += f' keys={self.keys}'
+        if self.inputs:
+            line += ' <- ' + ', '.join(f'#{number}' for number in self.inputs)
+        notes = []
+        if isinstance(self.operation, Presorted):
+            notes.append(f'sort skipped, input is sorted by {list(self.operation.input_order)}')
+        if self.processes:
+            notes.append(f'spawns {self.processes} process(es)')
+        if self.consumers > 1:
+            notes.append(f'output shared by {self.consumers} consumers (spilled to disk)')
+        return '; '.join([line] + notes)
+
+
+class Plan:
+    """Physical plan: stages of execution DAG, inputs go first, result is produced by the last one"""
+
+    def __init__(self, root: Node) -> None:
+        numbers: dict[int, int] = dict()
+        self.stages: list[Stage] = []
+        for node in reversed(topological_order(root)):
+            numbers[id(node)] = len(self.stages)
+            self.stages.append(Stage(len(self.stages), node, [numbers[id(input_node)] for input_node in node.inputs]))
+
+    @property
+    def sorts(self) -> int:
+        """Number of sorts (skipped ones excluded)"""
+        return sum(isinstance(stage.operation, ExternalSort) for stage in self.stages)
+
+    @property
+    def skipped_sorts(self) -> int:
+        return sum(isinstance(stage.operation, Presorted) for stage in self.stages)
+
+    @property
+    def processes(self) -> int:
+        """Number of processes spawned by run"""
+        return sum(stage.processes for stage in self.stages)
+
+    def __str__(self) -> str:
+        summary = f'sorts: {self.sorts} ({self.skipped_sorts} skipped), processes: {self.processes}, ' \
+                  f'shared outputs: {sum(stage.consumers > 1 for stage in self.stages)}'
+        return '\n'.join([str(stage) for stage in self.stages] + [summary])
+
+
+def prune_columns(root: Node) -> None:
+    """
+    Find columns needed from output of every node (by required_columns of its consumers) and drop
+    the rest before operations which buffer or ship rows (sorts and joins), unless input is known
+    (by output_columns of operations) to have no other columns
+    """
+    needed: dict[int, ops.TColumns] = {id(root): None}
+    required: dict[int, ops.TColumns] = dict()
+    order = topological_order(root)
+    for node in order:
+        columns = required[id(node)] = node.operation.required_columns(needed[id(node)])
+        for input_node in node.inputs:
+            if id(input_node) not in needed:
+                needed[id(input_node)] = columns
+            else:
+                previous = needed[id(input_node)]
+                needed[id(input_node)] = None if previous is None or columns is None else set(previous) | columns
+
+    outputs: dict[int, ops.TColumns] = dict()
+    for node in reversed(order):
+        columns = required[id(node)]
+        if isinstance(node.operation, PRUNED_OPERATIONS) and columns is not None:
+            node.inputs = [_pruned(input_node, columns, outputs) for input_node in node.inputs]
+        outputs[id(node)] = node.operation.output_columns([outputs[id(input_node)] for input_node in node.inputs])
+
+
+def _pruned(node: Node, columns: tp.AbstractSet[str], outputs: dict[int, ops.TColumns]) -> Node:
+    known = outputs[id(node)]
+    if known is not None and known <= columns:
+        return node
+    prune = Node(ops.Prune(frozenset(columns)), [node])
+    prune.consumers = 1
+    outputs[id(prune)] = prune.operation.output_columns([known])
+    return prune
+
+
+def fuse_maps(root: Node) -> Node:
+    """
+    Replace chains of Map nodes (each but the last consumed only by the next one) with FusedMap nodes
+    :return: root of rewritten DAG
+    """
+    fused: dict[int, Node] = dict()
+
+    def rewrite(node: Node) -> Node:
+        if id(node) in fused:
+            return fused[id(node)]
+        mappers: list[ops.Mapper] = []
+        start = node
+        while isinstance(start.operation, ops.Map):
+            mappers.append(start.operation.mapper)
+            (input_node,) = start.inputs
+            if input_node.consumers > 1 or not isinstance(input_node.operation, ops.Map):
+                break
+            start = input_node
+        if len(mappers) > 1:
+            result = Node(ops.FusedMap(mappers[::-1]), [rewrite(input_node) for input_node in start.inputs])
+        else:
+            result = Node(node.operation, [rewrite(input_node) for input_node in node.inputs])
+        result.consumers = node.consumers
+        fused[id(node)] = result
+        return result
+
+    return rewrite(root)
+
+
+class SharedStream:
+    """
+    Output of node consumed by several nodes. Rows are pulled from the node once, in chunks, and spilled
+    to temporary file; every consumer reads the file at its own pace (and gets its own copy of rows).
+    """
+
+    def __init__(self, rows: ops.TRowsIterable, consumers: int, chunk_size: int = 1000) -> None:
+        """
+        :param rows: output of node
+        :param consumers: number of readers
+        :param chunk_size: number of rows pulled from node and pickled at once
+        """
+        self._rows = iter(rows)
+        self._file = tempfile.NamedTemporaryFile(prefix='compgraph_shared_')
+        self._chunks = 0
+        self._exhausted = False
+        self._active = consumers
+        self._chunk_size = chunk_size
+
+    def _pull(self) -> None:
+        chunk = list(itertools.islice(self._rows, self._chunk_size))
+        if chunk:
+            pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._file.flush()
+            self._chunks += 1
+        self._exhausted = len(chunk) < self._chunk_size
+
+    def reader(self) -> ops.TRowsGenerator:
+        """Iterate over all rows of node"""
+        position = 0
+        try:
+            with open(self._file.name, 'rb') as f:
+                while True:
+                    if position == self._chunks:
+                        if self._exhausted:
+                            break
+                        self._pull()
+                        continue
+                    yield from pickle.load(f)
+                    position += 1
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self._file.close()
+
+
+def execute(root: Node, profiler: 'Profiler | None' = None, **kwargs: tp.Any) -> ops.TRowsIterable:
+    """
+    Run DAG: outputs of nodes with several consumers are computed once and shared.
+    Batched operations following each other exchange column-oriented batches directly
+    :param profiler: if given, inputs and outputs of every node are passed through it (batched operations
+        exchange rows then, so that every node is measured on its own)
+    """
+    shared: dict[int, SharedStream] = dict()
+
+    def open_input(node: Node, consumer: Node) -> ops.TRowsIterable:
+        if node.consumers <= 1:
+            rows = run(node)
+        else:
+            if id(node) not in shared:
+                shared[id(node)] = SharedStream(run(node), node.consumers)
+            rows = shared[id(node)].reader()
+        return rows if profiler is None else profiler.input(consumer, rows)
+
+    def run_batches(node: Node) -> ops.TBatchesIterable:
+        (input_node,) = node.inputs
+        if isinstance(node.operation, ops.BatchReduce):
+            return node.operation.reduce_batches(open_input(input_node, node))
+        assert isinstance(node.operation, ops.BatchMap)
+        if input_node.consumers <= 1 and isinstance(input_node.operation, BATCHED_OPERATIONS) and profiler is None:
+            return node.operation.map_batches(run_batches(input_node))
+        return node.operation.map_batches(ops.to_batches(open_input(input_node, node), node.operation.batch_size))
+
+    def run(node: Node) -> ops.TRowsIterable:
+        if isinstance(node.operation, BATCHED_OPERATIONS):
+            rows = ops.from_batches(run_batches(node))
+        else:
+            operation = node.operation if profiler is None else profiler.operation(node)
+            rows = operation(*(open_input(input_node, node) for input_node in node.inputs), **kwargs)
+        return rows if profiler is None else profiler.output(node, rows)
+
+    return run(root)
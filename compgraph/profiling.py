@@ -0,0 +1,192 @@
+import copy
+import os
+import threading
+import time
+import typing as tp
+
+from . import operations as ops
+from . import plan
+from .external_sort import ExternalSort
+
+try:
+    import psutil  # type: ignore
+except ImportError:  # pragma: no cover
+    psutil = None  # type: ignore[assignment, unused-ignore]
+
+KiB = 1024
+MiB = 1024 ** 2
+
+
+def rss() -> int | None:
+    """Resident set size of current process in bytes (None if psutil is not installed)"""
+    if psutil is None:  # pragma: no cover
+        return None
+    return int(psutil.Process(os.getpid()).memory_info().rss)
+
+
+class StageProfile:
+    """
+    Measurements of one stage of physical plan. Time is spent inside the stage only: time of pulling rows
+    from its inputs is excluded. Memory is memory of current process (processes spawned by stage are not counted);
+    stages run interleaved, so RSS delta of stage includes memory kept by its inputs while it was running
+    """
+
+    def __init__(self, stage: plan.Stage) -> None:
+        self.stage = stage
+        self.rows_in = 0
+        self.rows_out = 0
+        self.seconds = 0.0
+        self.pipe_bytes = 0
+        self.rss_before: int | None = None
+        self.rss_after: int | None = None
+        self.rss_peak: int | None = None
+
+    @property
+    def rss_delta(self) -> int | None:
+        """Change of RSS between the first row requested from stage and its exhaustion"""
+        if self.rss_before is None or self.rss_after is None:
+            return None
+        return self.rss_after - self.rss_before
+
+    def add_pipe_bytes(self, size: int) -> None:
+        self.pipe_bytes += size
+
+    def sample(self, usage: int) -> None:
+        self.rss_peak = usage if self.rss_peak is None else max(self.rss_peak, usage)
+
+    def __str__(self) -> str:
+        line = f'#{self.stage.number} {self.stage.kind}: {self.stage.name}; rows: {self.rows_in} -> {self.rows_out}, ' \
+               f'time: {self.seconds:.3f}s'
+        if isinstance(self.stage.operation, ExternalSort):
+            line += f', sort pipe: {self.pipe_bytes / KiB:.1f} KiB'
+        if self.rss_delta is not None:
+            line += f', rss delta: {self.rss_delta / MiB:+.1f} MiB'
+        if self.rss_peak is not None:
+            line += f', rss peak: {self.rss_peak / MiB:.1f} MiB'
+        return line
+
+
+class Report:
+    """Profile of run: measurements of every stage of physical plan (inputs go first)"""
+
+    def __init__(self, physical_plan: plan.Plan, stages: list[StageProfile]) -> None:
+        self.plan = physical_plan
+        self.stages = stages
+
+    @property
+    def seconds(self) -> float:
+        """Time of run spent in all stages"""
+        return sum(stage.seconds for stage in self.stages)
+
+    @property
+    def pipe_bytes(self) -> int:
+        """Bytes shipped to and from sorting processes"""
+        return sum(stage.pipe_bytes for stage in self.stages)
+
+    def slowest(self) -> StageProfile:
+        return max(self.stages, key=lambda stage: stage.seconds)
+
+    def __str__(self) -> str:
+        summary = f'time: {self.seconds:.3f}s, sort pipe: {self.pipe_bytes / KiB:.1f} KiB'
+        return '\n'.join([str(stage) for stage in self.stages] + [summary])
+
+
+class Profiler:
+    """
+    Collects measurements of stages while DAG is executed (see plan.execute): output of every node is timed,
+    time of pulling rows from its inputs is subtracted. RSS is sampled by background thread and attributed
+    to stage computing at the moment
+    """
+
+    def __init__(self, root: plan.Node, sample_period: float = 0.01) -> None:
+        """
+        :param root: root of DAG to be executed
+        :param sample_period: period (in seconds) of RSS sampling
+        """
+        physical_plan = plan.Plan(root)
+        nodes = reversed(plan.topological_order(root))
+        self._profiles = {id(node): StageProfile(stage) for node, stage in zip(nodes, physical_plan.stages)}
+        self.report = Report(physical_plan, list(self._profiles.values()))
+        self._active: list[StageProfile] = []
+        self._sample_period = sample_period
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self) -> None:
+        if psutil is not None:
+            self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._sampler.is_alive():
+            self._sampler.join()
+
+    def _sample(self) -> None:
+        process = psutil.Process(os.getpid())
+        while not self._stop_event.wait(self._sample_period):
+            active = self._active
+            if active:
+                active[-1].sample(process.memory_info().rss)
+
+    def operation(self, node: plan.Node) -> ops.Operation:
+        """Operation to call for node: sorts report bytes shipped through their pipes"""
+        if not isinstance(node.operation, ExternalSort):
+            return node.operation
+        operation = copy.copy(node.operation)
+        operation.counter = self._profiles[id(node)].add_pipe_bytes
+        return operation
+
+    def input(self, node: plan.Node, rows: ops.TRowsIterable) -> ops.TRowsGenerator:
+        """Count rows consumed by node; time of pulling them is not time of node"""
+        profile = self._profiles[id(node)]
+        iterator = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                profile.seconds -= time.perf_counter() - start
+                return
+            profile.seconds -= time.perf_counter() - start
+            profile.rows_in += 1
+            yield row
+
+    def output(self, node: plan.Node, rows: ops.TRowsIterable) -> ops.TRowsGenerator:
+        """Count and time rows produced by node"""
+        profile = self._profiles[id(node)]
+        profile.rss_before = rss()
+        iterator = iter(rows)
+        while True:
+            self._active.append(profile)
+            start = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                profile.seconds += time.perf_counter() - start
+                self._active.pop()
+                profile.rss_after = rss()
+                return
+            profile.seconds += time.perf_counter() - start
+            self._active.pop()
+            profile.rows_out += 1
+            yield row
+
+
+class ProfiledRun:
+    """
+    Result of Graph.run(profile=True): rows of result (may be iterated once) and report
+    which is complete when rows are exhausted
+    """
+
+    def __init__(self, root: plan.Node, **kwargs: tp.Any) -> None:
+        self._profiler = Profiler(root)
+        self._root = root
+        self._kwargs = kwargs
+        self.report = self._profiler.report
+
+    def __iter__(self) -> ops.TRowsGenerator:
+        self._profiler.start()
+        try:
+            yield from plan.execute(self._root, profiler=self._profiler, **self._kwargs)
+        finally:
+            self._profiler.stop()
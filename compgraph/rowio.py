@@ -0,0 +1,112 @@
+import pickle
+import typing as tp
+
+from .compression import open_binary
+
+TRow = dict[str, tp.Any]
+
+DEFAULT_ROWS_CHUNK_SIZE = 1000
+
+
+class RowWriter:
+    """Write rows to binary file in pickle frames holding lists of chunk_size rows (call flush after the last row)"""
+
+    def __init__(self, file: tp.BinaryIO, chunk_size: int = DEFAULT_ROWS_CHUNK_SIZE) -> None:
+        """
+        :param file: file opened for binary writing
+        :param chunk_size: number of rows in one frame
+        """
+        self._pickler = pickle.Pickler(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._chunk_size = chunk_size
+        self._chunk: list[tp.Any] = []
+        self.count = 0
+
+    def write(self, row: TRow) -> None:
+        self._chunk.append(row)
+        if len(self._chunk) >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows"""
+        if self._chunk:
+            self._dump(self._chunk)
+            self.count += len(self._chunk)
+            self._chunk = []
+
+    def _dump(self, value: tp.Any) -> None:
+        self._pickler.dump(value)
+        self._pickler.clear_memo()
+
+
+def _load_frames(file: tp.BinaryIO) -> tp.Generator[tp.Any, None, None]:
+    """Values of pickle frames up to the end of file"""
+    while True:
+        try:
+            # new unpickler for every frame: memo of one unpickler would keep every row read alive
+            yield pickle.load(file)
+        except EOFError:
+            break
+
+
+def dump_rows(rows: tp.Iterable[TRow], file: tp.BinaryIO) -> None:
+    """Write rows to binary file (see RowWriter)"""
+    writer = RowWriter(file)
+    for row in rows:
+        writer.write(row)
+    writer.flush()
+
+
+def load_rows(filename: str, compression: str | None = None) -> tp.Generator[TRow, None, None]:
+    """
+    Read rows written by RowWriter or dump_rows
+    :param compression: compression of file (see compression.detect)
+    """
+    with open_binary(filename, 'rb', compression) as f:
+        for chunk in _load_frames(f):
+            yield from chunk
+
+
+BINARY_FORMAT = 'compgraph-rows'
+BINARY_VERSION = 1
+
+
+class BinaryWriter(RowWriter):
+    """
+    Write rows to binary file: header frame followed by frames of RowWriter (pickle protocol 5).
+    If schema is given, rows with exactly these columns (in this order) are stored as tuples of values,
+    which is smaller and faster to read; other rows are stored as they are.
+    Files are read by read_binary (pickle is used, so read only files you trust)
+    """
+
+    def __init__(self, file: tp.BinaryIO, schema: tp.Sequence[str] | None = None,
+                 chunk_size: int = DEFAULT_ROWS_CHUNK_SIZE) -> None:
+        """
+        :param file: file opened for binary writing
+        :param schema: columns shared by rows
+        :param chunk_size: number of rows in one frame
+        """
+        super().__init__(file, chunk_size)
+        self._schema = None if schema is None else tuple(schema)
+        self._dump((BINARY_FORMAT, BINARY_VERSION, self._schema))
+
+    def write(self, row: TRow) -> None:
+        self._chunk.append(tuple(row.values()) if self._schema is not None and tuple(row) == self._schema else row)
+        if len(self._chunk) >= self._chunk_size:
+            self.flush()
+
+
+def read_binary(filename: str) -> tp.Generator[TRow, None, None]:
+    """Read rows written by BinaryWriter (file compressed by sinks is decompressed)"""
+    with open_binary(filename, 'rb') as f:
+        try:
+            header = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            header = None
+        if not (isinstance(header, tuple) and len(header) == 3 and header[0] == BINARY_FORMAT):
+            raise ValueError(f'{filename} is not a binary row file')
+        if header[1] != BINARY_VERSION:
+            raise ValueError(f'{filename} has unsupported version {header[1]} of binary row format')
+        schema = header[2]
+        for chunk in _load_frames(f):
+            for row in chunk:
+                yield dict(zip(schema, row)) if isinstance(row, tuple) else row
@@ -0,0 +1,145 @@
+import csv
+import io
+import itertools
+import json
+import typing as tp
+from abc import ABC, abstractmethod
+
+from .compression import open_binary
+from .rowio import BinaryWriter
+
+try:
+    import orjson  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+TRow = dict[str, tp.Any]
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Sink(ABC):
+    """Base class for writers of rows to file in some format, rows are written in batches"""
+
+    def __init__(self, file: tp.BinaryIO) -> None:
+        """
+        :param file: file opened for binary writing
+        """
+        self.file = file
+
+    @abstractmethod
+    def write_batch(self, rows: list[TRow]) -> None:
+        pass
+
+    def close(self) -> None:
+        """Write everything kept by sink (file is not closed)"""
+        pass
+
+
+class JsonLinesSink(Sink):
+    """
+    One JSON object per line (tuples become lists, values JSON doesn't support are errors).
+    orjson is used if installed, batches it can't encode are encoded by json module
+    """
+
+    def __init__(self, file: tp.BinaryIO) -> None:
+        super().__init__(file)
+        self._encode = json.JSONEncoder(ensure_ascii=False, check_circular=False).encode
+
+    def write_batch(self, rows: list[TRow]) -> None:
+        if orjson is not None:
+            try:
+                self.file.write(b'\n'.join(map(orjson.dumps, rows)) + b'\n')
+                return
+            except TypeError:  # e.g. integers wider than 64 bits
+                pass
+        self.file.write(('\n'.join(map(self._encode, rows)) + '\n').encode())
+
+
+class TsvSink(Sink):
+    """Tab-separated values of columns (taken from the first row if not given), optionally with header"""
+
+    def __init__(self, file: tp.BinaryIO, columns: tp.Sequence[str] | None = None, header: bool = False) -> None:
+        """
+        :param columns: columns to write in order (missing values are written empty)
+        :param header: whether the first line holds names of columns
+        """
+        super().__init__(file)
+        self.columns = columns
+        self.header = header
+        self._text = io.TextIOWrapper(file, encoding='utf-8', newline='', write_through=True)
+        self._writer = csv.writer(self._text, delimiter='\t', lineterminator='\n')
+
+    def write_batch(self, rows: list[TRow]) -> None:
+        if self.columns is None:
+            self.columns = list(rows[0])
+        if self.header:
+            self._writer.writerow(self.columns)
+            self.header = False
+        columns = self.columns
+        self._writer.writerows([row.get(column) for column in columns] for row in rows)
+
+    def close(self) -> None:
+        self._text.flush()
+        self._text.detach()
+
+
+class BinarySink(Sink):
+    """Binary row format (see rowio.BinaryWriter), read by Graph.graph_from_binary_file"""
+
+    def __init__(self, file: tp.BinaryIO, columns: tp.Sequence[str] | None = None) -> None:
+        """
+        :param columns: schema shared by rows
+        """
+        super().__init__(file)
+        self._writer = BinaryWriter(file, columns, DEFAULT_BATCH_SIZE)
+
+    def write_batch(self, rows: list[TRow]) -> None:
+        for row in rows:
+            self._writer.write(row)
+
+    def close(self) -> None:
+        self._writer.flush()
+
+
+SINKS: dict[str, tp.Callable[..., Sink]] = {
+    'jsonl': JsonLinesSink,
+    'tsv': TsvSink,
+    'binary': BinarySink,
+}
+
+
+def open_output(filename: str, compression: str | None = 'auto',
+                buffer_size: int = DEFAULT_BUFFER_SIZE) -> tp.BinaryIO:
+    """
+    Open file for binary writing
+    :param compression: one of compression.COMPRESSIONS, None for plain file, 'auto' to choose it by suffix
+        of filename
+    :param buffer_size: size of write buffer of plain file in bytes (compressed files are written
+        by whole compressed blocks)
+    """
+    return open_binary(filename, 'wb', compression, buffer_size)
+
+
+def write_rows(rows: tp.Iterable[TRow], filename: str, format: str = 'jsonl', compression: str | None = 'auto',
+               batch_size: int = DEFAULT_BATCH_SIZE, **options: tp.Any) -> int:
+    """
+    Write rows to file in batches
+    :param format: one of SINKS
+    :param compression: see open_output
+    :param batch_size: number of rows serialized at once
+    :param options: arguments of sink (e.g. columns)
+    :return: number of rows written
+    """
+    if format not in SINKS:
+        raise ValueError(f'unknown format {format!r}, known are {sorted(SINKS)}')
+    count = 0
+    rows_iter = iter(rows)
+    with open_output(filename, compression) as file:
+        sink = SINKS[format](file, **options)
+        while batch := list(itertools.islice(rows_iter, batch_size)):
+            sink.write_batch(batch)
+            count += len(batch)
+        sink.close()
+    return count
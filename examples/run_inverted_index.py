@@ -1,26 +1,24 @@
 import click
+from compgraph.sinks import SINKS
 from compgraph.algorithms import inverted_index_graph
 
 
 @click.command()
 @click.option('--input', help='Input file name')
 @click.option('--output', help='Output file name')
+@click.option('--format', 'output_format', default='jsonl', type=click.Choice(sorted(SINKS)),
+              help='Output format (compressed if output file name ends with .gz, .bz2 or .xz)')
 @click.option('--doc', default='doc_id', help='Document id column name')
 @click.option('--text', default='text', help='Text column name')
 @click.option('--res', default='tf_idf', help='Result column name')
-def main(input: str, output: str, doc: str, text: str, res: str) -> None:
+def main(input: str, output: str, output_format: str, doc: str, text: str, res: str) -> None:
     graph = inverted_index_graph(input_stream_name=input,
                                  doc_column=doc,
                                  text_column=text,
                                  result_column=res,
                                  filemod=True)
 
-    output_filepath = output
-
-    result = graph.run()
-    with open(output_filepath, "w") as out:
-        for row in result:
-            print(row, file=out)
+    graph.run_to_file(output, output_format)
 
 
 if __name__ == "__main__":
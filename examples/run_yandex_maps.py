@@ -1,4 +1,5 @@
 import click
+from compgraph.sinks import SINKS
 from compgraph.algorithms import yandex_maps_graph
 
 
@@ -6,6 +7,8 @@ from compgraph.algorithms import yandex_maps_graph
 @click.option('--input-time', help='Input time file name', type=str)
 @click.option('--input-length', help='Input length file name', type=str)
 @click.option('--output', help='Output file name', type=str)
+@click.option('--format', 'output_format', default='jsonl', type=click.Choice(sorted(SINKS)),
+              help='Output format (compressed if output file name ends with .gz, .bz2 or .xz)')
 @click.option('--enter-time', default='enter_time', help='Enter time column name')
 @click.option('--leave-time', default='leave_time', help='Leave time column name')
 @click.option('--edge-id', default='edge_id', help='Graph edge identifier column name')
@@ -14,7 +17,7 @@ from compgraph.algorithms import yandex_maps_graph
 @click.option('--weekday-result', default='weekday', help='Result weekday column name')
 @click.option('--hour-result', default='hour', help='Result hour column name')
 @click.option('--speed-result', default='speed', help='Result speed column name')
-def main(input_time: str, input_length: str, output: str,
+def main(input_time: str, input_length: str, output: str, output_format: str,
          enter_time: str, leave_time: str, edge_id: str,
          start_coord: str, end_coord: str, weekday_result: str, hour_result: str,
          speed_result: str) -> None:
@@ -30,12 +33,7 @@ def main(input_time: str, input_length: str, output: str,
                               speed_result_column=speed_result,
                               filemod=True)
 
-    output_filepath = output
-
-    result = graph.run()
-    with open(output_filepath, "w") as out:
-        for row in result:
-            print(row, file=out)
+    graph.run_to_file(output, output_format)
 
 
 if __name__ == "__main__":
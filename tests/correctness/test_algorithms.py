@@ -1,6 +1,8 @@
 from itertools import islice, cycle
 from operator import itemgetter
 
+import pytest
+from dateutil.parser import parse  # type: ignore
 from pytest import approx
 
 from compgraph import algorithms
@@ -180,3 +182,15 @@ def test_yandex_maps() -> None:
     result = graph.run(travel_time=lambda: islice(cycle(iter(times)), len(times)), edge_length=lambda: iter(lengths))
 
     assert sorted(result, key=itemgetter('weekday', 'hour')) == expected
+
+
+@pytest.mark.parametrize('value', ['20171020T112238.723000', '20171022T000000.000001', '2017-10-20 11:22:38',
+                                   '20171020T112238', '20171320T112238.723000'])
+def test_parse_timestamp(value: str) -> None:
+    try:
+        expected = parse(value)
+    except ValueError:
+        with pytest.raises(ValueError):
+            algorithms.parse_timestamp(value)
+        return
+    assert algorithms.parse_timestamp(value) == expected
@@ -537,6 +537,26 @@ JOIN_CASES = [
         join_data_left_items=(0, 1),
         join_data_right_items=(0,),
         join_ground_truth_items=(1, 2)
+    ),
+    JoinCase(
+        joiner=ops.InnerJoiner(suffix_a='', suffix_b='_r'),
+        join_keys=('k',),
+        data_left=[
+            {'k': 1, 'x': 'A'},
+            {'k': 2, 'x': 'C'}
+        ],
+        data_right=[
+            {'k': 1, 'x': 'B'},
+            {'k': 2, 'x': 'D'}
+        ],
+        ground_truth=[
+            {'k': 1, 'x': 'A', 'x_r': 'B'},
+            {'k': 2, 'x': 'C', 'x_r': 'D'}
+        ],
+        cmp_keys=('k', 'x', 'x_r'),
+        join_data_left_items=(0,),
+        join_data_right_items=(0,),
+        join_ground_truth_items=(0,)
     )
 ]
 
@@ -556,3 +576,85 @@ def test_joiner(case: JoinCase) -> None:
     result = ops.Join(case.joiner, case.join_keys)(iter(case.data_left), iter(case.data_right))
     assert isinstance(result, tp.Iterator)
     assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+@pytest.mark.parametrize('case', JOIN_CASES)
+def test_hash_joiner(case: JoinCase) -> None:
+    key_func = _Key(*case.cmp_keys)
+
+    result = ops.HashJoin(case.joiner, case.join_keys)(iter(case.data_left), iter(case.data_right))
+    assert isinstance(result, tp.Iterator)
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+    reversed_result = ops.HashJoin(case.joiner, case.join_keys)(reversed(case.data_left), reversed(case.data_right))
+    assert sorted(reversed_result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+@pytest.mark.parametrize('max_rows', [None, 2])
+@pytest.mark.parametrize('case', REDUCE_CASES)
+def test_hash_reducer(case: ReduceCase, max_rows: int | None) -> None:
+    key_func = _Key(*case.cmp_keys)
+
+    result = ops.HashReduce(case.reducer, case.reducer_keys, max_rows=max_rows)(iter(case.data))
+    assert isinstance(result, tp.Iterator)
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+@pytest.mark.parametrize('combined', [False, True])
+def test_hash_reducer_spills_partial_states(combined: bool) -> None:
+    rows = [{'key': i % 100, 'value': i, 'other': 'x'} for i in range(1000)]
+    expected = [{'key': key, 'value': sum(range(key, 1000, 100))} for key in range(100)]
+    if combined:
+        rows = list(ops.Combine(ops.Sum('value'), ['key'], max_groups=30)(iter(rows)))
+
+    result = ops.HashReduce(ops.Sum('value'), ['key'], max_rows=10, partitions=4, combined=combined)(iter(rows))
+    assert sorted(result, key=lambda row: row['key']) == expected
+
+
+@pytest.mark.parametrize('case', [case for case in REDUCE_CASES if isinstance(case.reducer, ops.CombinableReducer)])
+def test_combined_reducer(case: ReduceCase) -> None:
+    assert isinstance(case.reducer, ops.CombinableReducer)
+    key_func = _Key(*case.cmp_keys)
+
+    partials = list(ops.Combine(case.reducer, case.reducer_keys, max_groups=2)(iter(case.data)))
+    assert len(partials) <= len(case.data)
+    partials.sort(key=lambda row: tuple(row[key] for key in case.reducer_keys))
+
+    result = ops.Reduce(case.reducer, case.reducer_keys, combined=True)(iter(partials))
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+    result = ops.HashReduce(case.reducer, case.reducer_keys, combined=True)(iter(partials))
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+def test_combined_reduce_requires_combinable_reducer() -> None:
+    with pytest.raises(TypeError):
+        ops.Reduce(ops.FirstReducer(), ('key',), combined=True)
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 1000])
+@pytest.mark.parametrize('case', MAP_CASES)
+def test_batch_mapper(case: MapCase, batch_size: int) -> None:
+    key_func = _Key(*case.cmp_keys)
+
+    result = ops.BatchMap(case.mapper, batch_size)(iter(copy.deepcopy(case.data)))
+    assert isinstance(result, tp.Iterator)
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+@pytest.mark.parametrize('case', REDUCE_CASES)
+def test_batch_reducer(case: ReduceCase) -> None:
+    key_func = _Key(*case.cmp_keys)
+
+    result = ops.BatchReduce(case.reducer, case.reducer_keys)(iter(case.data))
+    assert isinstance(result, tp.Iterator)
+    assert sorted(result, key=key_func) == sorted(case.ground_truth, key=key_func)
+
+
+def test_batch_round_trip() -> None:
+    rows: list[ops.TRow] = [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}, {'c': 3}, {'a': 4, 'b': 'z'}]
+
+    batches = list(ops.to_batches(iter(rows), batch_size=2))
+    assert [batch.size for batch in batches] == [2, 1, 1]
+    assert batches[0].columns == {'a': [1, 2], 'b': ['x', 'y']}
+    assert list(ops.from_batches(batches)) == rows
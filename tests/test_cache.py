@@ -0,0 +1,107 @@
+import functools
+import itertools
+import os
+import tempfile
+
+from compgraph import algorithms, cache
+from compgraph import operations as ops
+from compgraph.graph import Graph
+
+DOCS = [{'doc_id': i, 'text': f'hello little world {i % 3} hello'} for i in range(30)]
+
+
+def _write_docs(filename: str, docs: list[ops.TRow]) -> None:
+    with open(filename, 'w') as f:
+        for row in docs:
+            print(row, file=f)
+
+
+def test_run_reuses_cached_results() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        input_filename = os.path.join(directory, 'docs.txt')
+        cache_dir = os.path.join(directory, 'cache')
+        _write_docs(input_filename, DOCS)
+        graph = algorithms.inverted_index_graph(input_filename, filemod=True)
+        expected = list(graph.run())
+
+        assert list(graph.run(cache_dir=cache_dir)) == expected
+        stages = graph.physical_plan(cache_dir=cache_dir).stages
+        assert [(stage.kind, type(stage.operation)) for stage in stages] == [('Read', ops.ReadBinary)]
+        assert list(graph.run(cache_dir=cache_dir)) == expected
+
+        changed = algorithms.inverted_index_graph(input_filename, result_column='score', filemod=True)
+        stages = changed.physical_plan(cache_dir=cache_dir).stages
+        assert isinstance(stages[0].operation, ops.ReadBinary) and stages[0].kind == 'Read'
+        assert not any(isinstance(stage.operation, ops.Read) for stage in stages)
+        assert [row['score'] for row in changed.run(cache_dir=cache_dir)] == [row['tf_idf'] for row in expected]
+
+
+def test_changed_input_file_is_not_read_from_cache() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        input_filename = os.path.join(directory, 'docs.txt')
+        cache_dir = os.path.join(directory, 'cache')
+        graph = algorithms.word_count_graph(input_filename, filemod=True)
+        _write_docs(input_filename, DOCS)
+        list(graph.run(cache_dir=cache_dir))
+        _write_docs(input_filename, DOCS[:1])
+        assert list(graph.run(cache_dir=cache_dir)) == list(graph.run())
+
+
+def test_partial_or_iterator_results_are_not_cached() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        input_filename = os.path.join(directory, 'docs.txt')
+        cache_dir = os.path.join(directory, 'cache')
+        _write_docs(input_filename, DOCS)
+        rows = Graph.graph_from_file(input_filename).sort(['text']).run(cache_dir=cache_dir)
+        assert len(list(itertools.islice(rows, 2))) == 2
+        rows.close()  # type: ignore[attr-defined]
+        assert os.listdir(cache_dir) == []
+
+        graph = Graph.graph_from_iter('docs').sort(['text'])
+        assert len(list(graph.run(cache_dir=cache_dir, docs=lambda: iter(DOCS)))) == len(DOCS)
+        assert os.listdir(cache_dir) == []
+
+
+def test_fingerprint_depends_on_closures() -> None:
+    def graph(offset: int) -> Graph:
+        return Graph.graph_from_file('docs.txt').map(ops.LambdaMapper(lambda row: [row | {'n': offset}]))
+
+    def fingerprint(graph: Graph) -> str:
+        return cache.describe(graph.physical_plan(optimize=False).stages[-1].operation)
+
+    assert fingerprint(graph(1)) == fingerprint(graph(1))
+    assert fingerprint(graph(1)) != fingerprint(graph(2))
+
+
+def _add(row: ops.TRow, n: int) -> ops.TRowsGenerator:
+    yield row | {'n': n}
+
+
+def test_fingerprint_depends_on_partial_arguments() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        input_filename = os.path.join(directory, 'docs.txt')
+        cache_dir = os.path.join(directory, 'cache')
+        _write_docs(input_filename, DOCS)
+        for n in [1, 2]:
+            graph = Graph.graph_from_file(input_filename).sort(['text']) \
+                .map(ops.LambdaMapper(functools.partial(_add, n=n))).sort(['text'])
+            assert [row['n'] for row in graph.run(cache_dir=cache_dir)] == [n] * len(DOCS)
+
+
+def test_undescribable_operations_are_not_cached() -> None:
+    class Slotted:
+        __slots__ = ('n',)
+
+        def __init__(self, n: int) -> None:
+            self.n = n
+
+        def __call__(self, row: ops.TRow) -> ops.TRowsGenerator:
+            yield row | {'n': self.n}
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_filename = os.path.join(directory, 'docs.txt')
+        cache_dir = os.path.join(directory, 'cache')
+        _write_docs(input_filename, DOCS)
+        graph = Graph.graph_from_file(input_filename).map(ops.LambdaMapper(Slotted(1))).sort(['text'])
+        assert len(list(graph.run(cache_dir=cache_dir))) == len(DOCS)
+        assert os.listdir(cache_dir) == []
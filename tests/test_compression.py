@@ -0,0 +1,60 @@
+import itertools
+import json
+import os
+import tempfile
+
+import pytest
+
+from compgraph import compression
+from compgraph.external_sort import ExternalSort
+from compgraph.graph import Graph
+
+ROWS = [{'n': i, 'text': f'line {i}'} for i in range(20000)]
+
+
+@pytest.mark.parametrize('suffix', ['.gz', '.bz2', '.xz'])
+def test_graph_from_compressed_file(suffix: str) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rows.jsonl' + suffix)
+        Graph.graph_from_iter('table').run_to_file(filename, table=lambda: iter(ROWS))
+        assert list(Graph.graph_from_file(filename).run()) == ROWS
+
+        rows = Graph.graph_from_file(filename).run()
+        assert list(itertools.islice(rows, 3)) == ROWS[:3]
+        rows.close()  # type: ignore[attr-defined]
+
+        with pytest.raises(ValueError):
+            Graph.graph_from_file(filename, workers=2)
+
+
+def test_threaded_reader_passes_errors() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rows.jsonl.gz')
+        with open(filename, 'wb') as f:
+            f.write(b'not gzip at all')
+        with pytest.raises(OSError):
+            list(Graph.graph_from_file(filename).run())
+
+
+def test_threaded_reader_reads_small_blocks() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rows.jsonl')
+        with open(filename, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in ROWS)
+        with compression.ThreadedReader(compression.open_binary(filename), read_size=7, queue_size=2) as reader:
+            data = reader.read()
+        with open(filename, 'rb') as f:
+            assert data == f.read()
+
+
+def test_binary_file_compressed() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rows.bin.xz')
+        Graph.graph_from_iter('table').run_to_file(filename, 'binary', table=lambda: iter(ROWS))
+        assert list(Graph.graph_from_binary_file(filename).run()) == ROWS
+
+
+def test_external_sort_with_compressed_spill() -> None:
+    rows = ROWS[::-1]
+    result = ExternalSort(['n'], memory_limit=10000, compression='gzip-fast')(iter(rows))
+    assert list(result) == ROWS
@@ -0,0 +1,67 @@
+import os
+import pickle
+import random
+import tempfile
+import tracemalloc
+
+from compgraph.external_sort import ExternalSort, row_size, sorted_runs
+from compgraph.graph import Graph
+from compgraph.rowio import dump_rows, load_rows
+
+
+def _rows(n: int) -> list[dict[str, int]]:
+    rnd = random.Random(42)
+    return [{'key': rnd.randrange(100), 'n': i} for i in range(n)]
+
+
+def test_sorted_runs_spill_is_stable() -> None:
+    rows = _rows(1000)
+    with tempfile.TemporaryDirectory() as directory:
+        result = list(sorted_runs(((row, 10) for row in rows), ['key'], 100, directory))
+    assert result == sorted(rows, key=lambda row: row['key'])
+
+
+def test_row_size_estimates_memory_of_unpickled_rows() -> None:
+    data = pickle.dumps([{'doc_id': i, 'text': f'text of document {i}'} for i in range(10000)])
+    tracemalloc.start()
+    try:
+        rows = pickle.loads(data)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert 0.7 < sum(map(row_size, rows)) / allocated < 1.5
+
+
+def test_spilled_rows_are_not_kept_while_read() -> None:
+    rows = _rows(20000)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rows')
+        with open(filename, 'wb') as f:
+            dump_rows(rows, f)
+        tracemalloc.start()
+        try:
+            assert sum(1 for _ in load_rows(filename)) == len(rows)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert peak < sum(map(row_size, rows)) / 4
+
+
+def test_external_sort_with_small_memory_limit() -> None:
+    rows = _rows(5000)
+    result = list(ExternalSort(['key', 'n'], memory_limit=1024)(iter(rows)))
+    assert result == sorted(rows, key=lambda row: (row['key'], row['n']))
+
+
+def test_graph_sort_memory_limit() -> None:
+    rows = _rows(2000)
+    graph = Graph.graph_from_iter('table').sort(['key'], memory_limit=512)
+    assert list(graph.run(table=lambda: iter(rows))) == sorted(rows, key=lambda row: row['key'])
+
+
+def test_external_sort_chunk_sizes() -> None:
+    rows = _rows(1000)
+    expected = sorted(rows, key=lambda row: row['key'])
+    for chunk_size in [1, 7, 1000, 5000]:
+        assert list(ExternalSort(['key'], chunk_size=chunk_size)(iter(rows))) == expected
+    assert list(ExternalSort(['key'])(iter([]))) == []
@@ -1,5 +1,9 @@
 import ast
+import copy
 import tempfile
+import typing as tp
+
+import pytest
 
 from compgraph.graph import Graph
 from compgraph import operations as ops
@@ -38,6 +42,24 @@ def test_graph_from_file_without_commands() -> None:
     file.close()
 
 
+def test_graph_binary_file_round_trip() -> None:
+    rows = SIMPLE_TABLE + [{'doc_id': 7}, {'text': 'no id', 'doc_id': 8}]
+    with tempfile.NamedTemporaryFile() as file:
+        written = Graph.graph_from_iter('texts').run_to_binary_file(file.name, schema=['doc_id', 'text'],
+                                                                    texts=lambda: iter(rows))
+        assert written == len(rows)
+        result = list(Graph.graph_from_binary_file(file.name).run())
+    assert result == rows
+    assert [list(row) for row in result] == [list(row) for row in rows]
+
+
+def test_graph_from_binary_file_rejects_text_file() -> None:
+    with tempfile.NamedTemporaryFile('w') as file:
+        print(SIMPLE_TABLE[0], file=file, flush=True)
+        with pytest.raises(ValueError):
+            list(Graph.graph_from_binary_file(file.name).run())
+
+
 def test_graph_from_iter_with_dummy_mapper() -> None:
     graph = Graph.graph_from_iter('texts').map(ops.DummyMapper())
     result = graph.run(texts=lambda: iter(SIMPLE_TABLE))
@@ -57,6 +79,17 @@ def test_graph_from_file_with_dummy_mapper() -> None:
     file.close()
 
 
+def test_graph_builder_shares_operations() -> None:
+    mapper = ops.DummyMapper()
+    graph = Graph.graph_from_iter('texts').map(mapper)
+    extended = graph.map(ops.Project(['doc_id']))
+    assert list(graph.run(texts=lambda: iter(SIMPLE_TABLE))) == SIMPLE_TABLE
+    assert list(extended.run(texts=lambda: iter(SIMPLE_TABLE))) == [{'doc_id': row['doc_id']} for row in SIMPLE_TABLE]
+
+    operation = extended.physical_plan(fuse=False).stages[1].operation
+    assert isinstance(operation, ops.Map) and operation.mapper is mapper
+
+
 def test_graph_first_reduce() -> None:
     graph = Graph.graph_from_iter('texts').reduce(ops.FirstReducer(), ['doc_id'])
     result = graph.run(texts=lambda: iter(SIMPLE_TABLE))
@@ -73,10 +106,230 @@ def test_graph_inner_join_with_non_linear() -> None:
     graph2 = graph.map(ops.LowerCase('text'))
     result = (graph1.join(ops.InnerJoiner(), graph2, ['doc_id'])).run(texts=lambda: iter(SIMPLE_TABLE))
     assert list(result) == [
-        {'doc_id': 1, 'text_1': 'hello little world', 'text_2': 'hello little world'},
+        {'doc_id': 1, 'text_1': 'hello little world', 'text_2': 'hello, little world'},
+        {'doc_id': 2, 'text_1': 'little', 'text_2': 'little'},
+        {'doc_id': 3, 'text_1': 'little little little', 'text_2': 'little little little'},
+        {'doc_id': 4, 'text_1': 'little hello little world', 'text_2': 'little? hello little world'},
+        {'doc_id': 5, 'text_1': 'HELLO HELLO WORLD', 'text_2': 'hello hello! world...'},
+        {'doc_id': 6, 'text_1': 'world world world WORLD HELLO', 'text_2': 'world? world... world!!! world!!! hello!!!'}
+    ]
+
+
+def test_graph_shared_branch_is_computed_once() -> None:
+    calls = 0
+
+    def source() -> tp.Iterator[ops.TRow]:
+        nonlocal calls
+        calls += 1
+        return iter(SIMPLE_TABLE)
+
+    graph = Graph.graph_from_iter('texts').map(ops.DummyMapper())
+    graph1 = graph.map(ops.Project(['doc_id']))
+    graph2 = graph.map(ops.Project(['doc_id', 'text']))
+    result = graph1.join(ops.InnerJoiner(), graph2, ['doc_id']).join(ops.InnerJoiner(), graph1, ['doc_id'])
+    assert list(result.run(texts=source)) == SIMPLE_TABLE
+    assert calls == 1
+
+
+def test_graph_hash_join_with_unsorted_input() -> None:
+    graph = Graph.graph_from_iter('texts')
+    graph1 = graph.map(ops.FilterPunctuation('text'))
+    graph2 = graph.map(ops.LowerCase('text')).reduce(ops.FirstReducer(), ['doc_id'])
+    result = graph1.hash_join(ops.InnerJoiner(), graph2, ['doc_id']).run(texts=lambda: reversed(SIMPLE_TABLE))
+    assert sorted(result, key=lambda row: row['doc_id']) == [
+        {'doc_id': 1, 'text_1': 'hello little world', 'text_2': 'hello, little world'},
         {'doc_id': 2, 'text_1': 'little', 'text_2': 'little'},
         {'doc_id': 3, 'text_1': 'little little little', 'text_2': 'little little little'},
-        {'doc_id': 4, 'text_1': 'little hello little world', 'text_2': 'little hello little world'},
-        {'doc_id': 5, 'text_1': 'hello hello world', 'text_2': 'hello hello world'},
-        {'doc_id': 6, 'text_1': 'world world world world hello', 'text_2': 'world world world world hello'}
+        {'doc_id': 4, 'text_1': 'little hello little world', 'text_2': 'little? hello little world'},
+        {'doc_id': 5, 'text_1': 'HELLO HELLO WORLD', 'text_2': 'hello hello! world...'},
+        {'doc_id': 6, 'text_1': 'world world world WORLD HELLO', 'text_2': 'world? world... world!!! world!!! hello!!!'}
+    ]
+
+
+def test_graph_hash_reduce_without_sort() -> None:
+    table = [{'doc_id': i % 3, 'n': i} for i in range(10)]
+    for max_rows in [None, 3]:
+        graph = Graph.graph_from_iter('texts').reduce(ops.Sum('n'), ['doc_id'], presorted=False, max_rows=max_rows)
+        result = graph.run(texts=lambda: iter(table))
+        assert sorted(result, key=lambda row: row['doc_id']) == [
+            {'doc_id': 0, 'n': 18},
+            {'doc_id': 1, 'n': 12},
+            {'doc_id': 2, 'n': 15}
+        ]
+
+
+def test_graph_batched_chain_matches_row_chain() -> None:
+    def build(batch_size: int | None) -> Graph:
+        return Graph.graph_from_iter('texts') \
+            .map(ops.FilterPunctuation('text'), batch_size=batch_size) \
+            .map(ops.LowerCase('text'), batch_size=batch_size) \
+            .map(ops.Split('text'), batch_size=batch_size) \
+            .sort(['text']) \
+            .reduce(ops.Count('count'), ['text'], batched=batch_size is not None) \
+            .map(ops.Project(['text', 'count']), batch_size=batch_size)
+
+    expected = list(build(None).run(texts=lambda: iter(SIMPLE_TABLE)))
+    for batch_size in [1, 4, 1000]:
+        assert list(build(batch_size).run(texts=lambda: iter(SIMPLE_TABLE))) == expected
+
+
+def test_graph_fused_maps_match_unfused() -> None:
+    graph = Graph.graph_from_iter('texts') \
+        .map(ops.FilterPunctuation('text')) \
+        .map(ops.LowerCase('text'))
+    words = graph.map(ops.Split('text')).map(ops.Filter(lambda row: len(row['text']) > 4))
+    result = graph.join(ops.InnerJoiner(), words, ['doc_id']).map(ops.Project(['doc_id', 'text_2']))
+
+    expected = list(result.run(fuse=False, texts=lambda: copy.deepcopy(SIMPLE_TABLE)))
+    assert len(expected) == 19
+    assert list(result.run(texts=lambda: copy.deepcopy(SIMPLE_TABLE))) == expected
+
+
+def test_graph_optimizer_keeps_results() -> None:
+    games = [{'game_id': i, 'player_id': i % 3, 'score': i, 'comment': 'x' * i} for i in range(10)]
+    players = [{'player_id': i, 'score': 10 * i, 'username': f'player{i}'} for i in range(3)]
+
+    def bonus(row: ops.TRow) -> ops.TRowsIterable:
+        return [row | {'bonus': row['score_1'] + row['score_2']}]
+
+    graph = Graph.graph_from_iter('games') \
+        .sort(['player_id']) \
+        .map(ops.Filter(lambda row: row['score'] > 2)) \
+        .join(ops.InnerJoiner(), Graph.graph_from_iter('players'), ['player_id']) \
+        .map(ops.LambdaMapper(bonus, reads=['score_1', 'score_2'], writes=['bonus'])) \
+        .sort(['game_id']) \
+        .map(ops.Project(['game_id', 'username', 'bonus']))
+
+    expected = list(graph.run(optimize=False, games=lambda: iter(games), players=lambda: iter(players)))
+    assert len(expected) == 7
+    assert list(graph.run(games=lambda: iter(games), players=lambda: iter(players))) == expected
+
+
+def test_graph_optimizer_pushes_filters_through_maps_and_joins() -> None:
+    games = [{'game_id': i, 'player_id': i % 3, 'score': i} for i in range(10)]
+    players = [{'player_id': i, 'username': f'Player{i}', 'level': i} for i in range(3)]
+
+    def build(condition: tp.Callable[[ops.TRow], bool], reads: list[str]) -> Graph:
+        left = Graph.graph_from_iter('games').map(ops.Project(['game_id', 'player_id', 'score']))
+        right = Graph.graph_from_iter('players').map(ops.Project(['player_id', 'username', 'level']))
+        return left.sort(['player_id']) \
+            .join(ops.InnerJoiner(), right.sort(['player_id']), ['player_id']) \
+            .map(ops.LowerCase('username')) \
+            .map(ops.Filter(condition, reads=reads)) \
+            .sort(['game_id'])
+
+    def filter_input(graph: Graph) -> str:
+        stages = graph.physical_plan(fuse=False).stages
+        (stage,) = [stage for stage in stages if isinstance(stage.operation, ops.Map)
+                    and isinstance(stage.operation.mapper, ops.Filter)]
+        input_stage = stages[stage.inputs[0]]
+        return f'{input_stage.name} <- ' + ', '.join(stages[number].name for number in input_stage.inputs)
+
+    for condition, reads, expected_input in [
+        (lambda row: row['score'] > 2, ['score'], "Map(Project) <- ReadIterFactory('games')"),
+        (lambda row: row['level'] > 0, ['level'], "Map(Project) <- ReadIterFactory('players')"),
+        (lambda row: row['player_id'] > 0, ['player_id'], "Map(Project) <- ReadIterFactory('games')"),
+        (lambda row: row['username'] != 'player1', ['username'], "Map(LowerCase) <- Join(InnerJoiner)"),
+        (lambda row: row['score'] > row['level'], ['score', 'level'],
+         "Join(InnerJoiner) <- ExternalSort, ExternalSort"),
+    ]:
+        graph = build(condition, reads)
+        assert filter_input(graph) == expected_input
+        expected = list(graph.run(optimize=False, games=lambda: iter(games), players=lambda: iter(players)))
+        assert expected
+        assert list(graph.run(games=lambda: iter(games), players=lambda: iter(players))) == expected
+
+
+def test_graph_optimizer_prunes_columns_before_sort() -> None:
+    seen: list[ops.TRow] = []
+
+    def spy(row: ops.TRow) -> ops.TRowsIterable:
+        seen.append(row)
+        return [row]
+
+    table = [{'doc_id': i, 'text': 'text', 'count': i} for i in range(3)]
+    graph = Graph.graph_from_iter('texts') \
+        .sort(['doc_id']) \
+        .map(ops.LambdaMapper(spy, reads=[])) \
+        .map(ops.Project(['doc_id']))
+
+    assert list(graph.run(texts=lambda: iter(table))) == [{'doc_id': i} for i in range(3)]
+    assert seen == [{'doc_id': i} for i in range(3)]
+
+
+def test_graph_optimizer_does_not_prune_narrow_rows() -> None:
+    docs = [{'doc_id': i, 'text': 'text', 'title': 'title'} for i in range(2)]
+    scores = [{'doc_id': i % 2, 'score': i, 'user': 'user'} for i in range(4)]
+    totals = Graph.graph_from_iter('scores').sort(['doc_id']).reduce(ops.Sum('score'), ['doc_id'])
+    graph = Graph.graph_from_iter('docs') \
+        .map(ops.LambdaMapper(lambda row: [row], reads=[], writes=[])) \
+        .sort(['doc_id']) \
+        .join(ops.InnerJoiner(), totals, ['doc_id']) \
+        .map(ops.Project(['doc_id', 'text', 'score']))
+
+    stages = graph.physical_plan(fuse=False).stages
+    assert [stages[stage.inputs[0]].kind for stage in stages if isinstance(stage.operation, ops.Prune)] == \
+        ['Map', 'Read']
+    (join,) = [stage for stage in stages if stage.kind == 'Join']
+    assert [stages[number].kind for number in join.inputs] == ['Sort', 'Reduce']
+    assert list(graph.run(docs=lambda: iter(docs), scores=lambda: iter(scores))) == \
+        [{'doc_id': 0, 'text': 'text', 'score': 2}, {'doc_id': 1, 'text': 'text', 'score': 4}]
+
+
+def test_graph_skips_sort_of_sorted_rows() -> None:
+    table = [{'doc_id': i % 3, 'text': text} for i, text in enumerate(['b', 'A', 'c', 'a', 'B', 'C'])]
+    graph = Graph.graph_from_iter('texts') \
+        .sort(['doc_id', 'text']) \
+        .map(ops.Filter(lambda row: row['text'] != 'c')) \
+        .sort(['doc_id']) \
+        .map(ops.LowerCase('text')) \
+        .sort(['doc_id', 'text'])
+
+    physical_plan = graph.physical_plan()
+    assert (physical_plan.sorts, physical_plan.skipped_sorts) == (2, 1)
+    assert "Sort: Presorted keys=['doc_id'] <- #2; sort skipped, input is sorted by ['doc_id', 'text']" \
+        in graph.explain(fuse=False)
+
+    expected = list(graph.run(optimize=False, texts=lambda: iter(table)))
+    assert list(graph.run(texts=lambda: iter(table))) == expected
+
+    left = [{'k': 1, 'x': 2}, {'k': 1, 'x': 1}]
+    right = [{'k': 2, 'x': 5}, {'k': 2, 'x': 3}, {'k': 1, 'y': 0}]
+    for joiner, skipped in [(ops.InnerJoiner(), 1), (ops.LeftJoiner(), 1), (ops.OuterJoiner(), 0),
+                            (ops.RightJoiner(), 0)]:
+        graph = Graph.graph_from_iter('left').sort(['k', 'x']) \
+            .join(joiner, Graph.graph_from_iter('right').sort(['k']), ['k']) \
+            .sort(['k', 'x'])
+        assert graph.physical_plan().skipped_sorts == skipped
+        expected = list(graph.run(optimize=False, left=lambda: iter(left), right=lambda: iter(right)))
+        assert list(graph.run(left=lambda: iter(left), right=lambda: iter(right))) == expected
+
+
+def test_graph_physical_plan() -> None:
+    graph = Graph.graph_from_iter('texts') \
+        .map(ops.LowerCase('text')) \
+        .sort(['text'])
+    graph = graph.join(ops.InnerJoiner(), Graph.graph_from_file('docs.txt', ast.literal_eval), ['text']) \
+        .join(ops.LeftJoiner(), graph, ['text'])
+
+    physical_plan = graph.physical_plan(optimize=False)
+    assert [(stage.kind, stage.keys, stage.inputs) for stage in physical_plan.stages] == [
+        ('Read', None, []),
+        ('Map', None, [0]),
+        ('Sort', ['text'], [1]),
+        ('Read', None, []),
+        ('Join', ['text'], [2, 3]),
+        ('Join', ['text'], [4, 2]),
+    ]
+    assert physical_plan.stages[2].consumers == 2
+    assert (physical_plan.sorts, physical_plan.processes) == (1, 1)
+    assert str(physical_plan).splitlines() == [
+        "#0 Read: ReadIterFactory('texts')",
+        '#1 Map: Map(LowerCase) <- #0',
+        "#2 Sort: ExternalSort keys=['text'] <- #1; spawns 1 process(es); "
+        'output shared by 2 consumers (spilled to disk)',
+        "#3 Read: Read('docs.txt')",
+        "#4 Join: Join(InnerJoiner) keys=['text'] <- #2, #3",
+        "#5 Join: Join(LeftJoiner) keys=['text'] <- #4, #2",
+        'sorts: 1 (0 skipped), processes: 1, shared outputs: 1',
     ]
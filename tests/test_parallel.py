@@ -0,0 +1,68 @@
+import ast
+import tempfile
+
+from compgraph import operations as ops
+from compgraph.graph import Graph
+from compgraph.parallel import ParallelMap, ParallelRead, PartitionedReduce
+
+
+def _split(row: ops.TRow) -> list[ops.TRow]:
+    return [{'n': row['n'], 'part': i} for i in range(row['n'] % 3)]
+
+
+def test_parallel_map_keeps_order() -> None:
+    rows = [{'n': i} for i in range(10000)]
+    expected = list(ops.Map(ops.LambdaMapper(_split))(iter(rows)))
+    result = ParallelMap(ops.LambdaMapper(_split), workers=3, chunk_size=100)(iter(rows))
+    assert list(result) == expected
+
+
+def test_parallel_map_unordered() -> None:
+    rows = [{'n': i} for i in range(10000)]
+    expected = list(ops.Map(ops.LambdaMapper(_split))(iter(rows)))
+    result = ParallelMap(ops.LambdaMapper(_split), workers=3, ordered=False, chunk_size=100)(iter(rows))
+    key = (lambda row: (row['n'], row['part']))
+    assert sorted(result, key=key) == sorted(expected, key=key)
+
+
+def test_graph_parallel_map_with_closure() -> None:
+    offset = 10
+    graph = Graph.graph_from_iter('table') \
+        .map(ops.LambdaMapper(lambda row: [row | {'m': row['n'] + offset}]), workers=2) \
+        .map(ops.Filter(lambda row: row['m'] % 2 == 0), workers=2, ordered=False)
+    result = graph.run(table=lambda: ({'n': i} for i in range(100)))
+    assert sorted(row['n'] for row in result) == list(range(0, 100, 2))
+
+
+def test_partitioned_reduce_matches_sort_reduce() -> None:
+    rows = [{'key': i * 7 % 13, 'word': str(i % 5), 'n': i} for i in range(5000)]
+    keys = ['key', 'word']
+    expected = list(ops.Reduce(ops.Sum('n'), keys)(sorted(rows, key=lambda row: (row['key'], row['word']))))
+    result = PartitionedReduce(ops.Sum('n'), keys, workers=3, chunk_size=100)(iter(rows))
+    assert list(result) == expected
+
+    result = PartitionedReduce(ops.Sum('n'), keys, workers=3, ordered=False, memory_limit=1024)(iter(rows))
+    assert sorted(result, key=lambda row: (row['key'], row['word'])) == expected
+
+
+def test_graph_partitioned_reduce() -> None:
+    graph = Graph.graph_from_iter('table') \
+        .map(ops.Split('text')) \
+        .reduce(ops.Count('count'), ['text'], workers=2)
+    result = graph.run(table=lambda: iter([{'text': 'b a c a'}, {'text': 'c a'}]))
+    assert list(result) == [{'text': 'a', 'count': 3}, {'text': 'b', 'count': 1}, {'text': 'c', 'count': 2}]
+
+
+def test_parallel_read_matches_read() -> None:
+    rows = [{'n': i, 'text': f'line {i}'} for i in range(3000)]
+    with tempfile.NamedTemporaryFile('w') as file:
+        file.write('\n'.join(repr(row) for row in rows))
+        file.flush()
+        assert list(ParallelRead(file.name, ast.literal_eval, workers=3, range_size=1000)()) == rows
+        result = Graph.graph_from_file(file.name, workers=2, ordered=False).run()
+        assert sorted(result, key=lambda row: row['n']) == rows
+
+
+def test_parallel_read_of_empty_file() -> None:
+    with tempfile.NamedTemporaryFile('w') as file:
+        assert list(Graph.graph_from_file(file.name, workers=2).run()) == []
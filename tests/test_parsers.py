@@ -0,0 +1,62 @@
+import json
+import typing as tp
+import tempfile
+
+import pytest
+
+from compgraph import parsers
+from compgraph.graph import Graph
+
+ROWS = [{'doc_id': i, 'text': f'hello, "world" {i}', 'tags': [i, None, True]} for i in range(25)]
+
+
+def _write(lines: list[str]) -> tp.Any:
+    file = tempfile.NamedTemporaryFile('w')
+    file.writelines(line + '\n' for line in lines)
+    file.flush()
+    return file
+
+
+@pytest.mark.parametrize('batch_size', [None, 1, 7, 1000])
+@pytest.mark.parametrize('dump', [json.dumps, repr])
+def test_auto_parser_reads_json_and_literals(dump: tp.Callable[[tp.Any], str], batch_size: int | None) -> None:
+    with _write([dump(row) for row in ROWS]) as file:
+        assert list(Graph.graph_from_file(file.name, batch_size=batch_size).run()) == ROWS
+    with _write([]) as file:
+        assert list(Graph.graph_from_file(file.name, batch_size=batch_size).run()) == []
+
+
+def test_auto_parser_detects_format_by_first_line() -> None:
+    parser = parsers.AutoParser(columns=['doc_id', 'text'])
+    assert isinstance(parser.detect('{"doc_id": 1}\n'), parsers.JsonParser)
+    assert isinstance(parser.detect("{'doc_id': 1}\n"), parsers.LiteralParser)
+    assert isinstance(parser.detect('1\thello\n'), parsers.CsvParser)
+    with pytest.raises(ValueError):
+        parsers.AutoParser().detect('1,hello\n')
+
+
+def test_json_parser_falls_back_for_other_lines() -> None:
+    parser = parsers.JsonParser(fallback=parsers.LiteralParser())
+    lines = ['{"doc_id": 1}\n', "{'doc_id': (2, 3)}\n"]
+    assert parser.parse_batch(lines) == [{'doc_id': 1}, {'doc_id': (2, 3)}]
+    with pytest.raises(ValueError):
+        parsers.JsonParser()(lines[1])
+
+
+@pytest.mark.parametrize('name, delimiter', [('csv', ','), ('tsv', '\t')])
+def test_delimited_parsers(name: str, delimiter: str) -> None:
+    parser = parsers.get_parser(name, columns={'doc_id': int, 'text': str})
+    quoted = '"hello, world"' if delimiter == ',' else 'hello, world'
+    lines = [f'1{delimiter}{quoted}\n', f'2{delimiter}bye\n']
+    expected = [{'doc_id': 1, 'text': 'hello, world'}, {'doc_id': 2, 'text': 'bye'}]
+    assert parser.parse_batch(lines) == expected
+    assert [parser(line) for line in lines] == expected
+
+
+def test_parser_registry() -> None:
+    parsers.register_parser('text', lambda: parsers.CsvParser(['text']))
+    with _write(['a', 'b']) as file:
+        assert list(Graph.graph_from_file(file.name, 'text').run()) == [{'text': 'a'}, {'text': 'b'}]
+    del parsers.PARSERS['text']
+    with pytest.raises(ValueError):
+        parsers.get_parser('text')
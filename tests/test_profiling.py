@@ -0,0 +1,38 @@
+from compgraph import operations as ops
+from compgraph.graph import Graph
+
+ROWS = [{'key': i % 10, 'text': f'word{i % 7} word{i % 3}'} for i in range(1000)]
+
+
+def test_profile_keeps_result() -> None:
+    graph = Graph.graph_from_iter('table').map(ops.Split('text')).sort(['text']).reduce(ops.Count('n'), ['text'])
+    profiled = graph.run(profile=True, table=lambda: iter(ROWS))
+    assert list(profiled) == list(graph.run(table=lambda: iter(ROWS)))
+
+
+def test_profile_counts_rows_and_pipe_bytes() -> None:
+    graph = Graph.graph_from_iter('table').map(ops.Split('text')).sort(['text']).reduce(ops.Count('n'), ['text'])
+    profiled = graph.run(profile=True, optimize=False, table=lambda: iter(ROWS))
+    assert len(list(profiled)) == 7
+
+    stages = profiled.report.stages
+    assert [(stage.stage.kind, stage.rows_in, stage.rows_out) for stage in stages] == [
+        ('Read', 0, 1000), ('Map', 1000, 2000), ('Sort', 2000, 2000), ('Reduce', 2000, 7)]
+    assert all(stage.seconds >= 0 for stage in stages)
+    assert stages[2].pipe_bytes > 0
+    assert profiled.report.pipe_bytes == stages[2].pipe_bytes
+    assert all(stage.rss_delta is not None for stage in stages)
+    assert str(stages[2]).startswith('#2 Sort: ExternalSort; rows: 2000 -> 2000, time: ')
+
+
+def test_profile_measures_batched_and_shared_stages_separately() -> None:
+    source = Graph.graph_from_iter('table') \
+        .map(ops.Project(['key']), batch_size=100).map(ops.DummyMapper(), batch_size=100)
+    graph = source.sort(['key']).join(ops.InnerJoiner(), source.sort(['key']), ['key'])
+    profiled = graph.run(profile=True, optimize=False, table=lambda: iter(ROWS[:20]))
+    assert len(list(profiled)) == 40
+
+    rows = {stage.stage.number: (stage.rows_in, stage.rows_out) for stage in profiled.report.stages}
+    assert rows[1] == (20, 20)
+    assert rows[2] == (20, 20)
+    assert rows[max(rows)] == (40, 40)
@@ -0,0 +1,62 @@
+import gzip
+import json
+import os
+import tempfile
+import typing as tp
+
+import pytest
+
+from compgraph import sinks
+from compgraph.graph import Graph
+
+ROWS = [{'doc_id': i, 'text': f'hello\tworld "{i}" é', 'tf_idf': i / 7} for i in range(2500)]
+
+
+def _run_to_file(filename: str, *args: tp.Any, **kwargs: tp.Any) -> int:
+    return Graph.graph_from_iter('table').run_to_file(filename, *args, table=lambda: iter(ROWS), **kwargs)
+
+
+@pytest.mark.parametrize('suffix', ['', '.gz'])
+def test_jsonl_sink(suffix: str) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.jsonl' + suffix)
+        assert _run_to_file(filename) == len(ROWS)
+        with (gzip.open(filename, 'rt') if suffix else open(filename)) as f:
+            assert [json.loads(line) for line in f] == ROWS
+
+
+def test_jsonl_sink_with_wide_integers() -> None:
+    rows = [{'n': 2 ** 70, 'text': 'wide'}, {'n': 1, 'text': 'narrow'}]
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.jsonl')
+        sinks.write_rows(rows, filename)
+        assert list(Graph.graph_from_file(filename).run()) == rows
+
+
+def test_tsv_sink_with_columns_and_header() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.tsv')
+        Graph.graph_from_iter('table').run_to_file(filename, 'tsv', columns=['text', 'doc_id'],
+                                                   table=lambda: iter(ROWS[:2]))
+        with open(filename, 'rb') as f, sinks.open_output(filename + '.header', None) as out:
+            assert f.read().decode() == '"hello\tworld ""0"" é"\t0\n"hello\tworld ""1"" é"\t1\n'
+            sink = sinks.TsvSink(out, header=True)
+            sink.write_batch(ROWS[:1])
+            sink.close()
+        with open(filename + '.header') as f:
+            assert f.readline() == 'doc_id\ttext\ttf_idf\n'
+
+
+def test_binary_sink() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.bin')
+        assert _run_to_file(filename, 'binary', columns=['doc_id', 'text', 'tf_idf']) == len(ROWS)
+        assert list(Graph.graph_from_binary_file(filename).run()) == ROWS
+
+
+def test_unknown_format_and_compression() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        with pytest.raises(ValueError):
+            _run_to_file(os.path.join(directory, 'result.xml'), 'xml')
+        with pytest.raises(ValueError):
+            _run_to_file(os.path.join(directory, 'result.jsonl'), compression='zip')
@@ -0,0 +1,19 @@
+import re
+import typing as tp
+
+import pytest
+
+from compgraph import operations as ops
+
+
+def old_split(row: ops.TRow) -> tp.Generator[ops.TRow, None, None]:
+    """Split as it was before the pattern was compiled once"""
+    for match in re.finditer(r'(?:^|\s+)((?:(?!\s+).)*)', row['text']):
+        yield row.copy() | {'text': match.group(1)}
+
+
+@pytest.mark.parametrize('text', ['', ' ', 'one', ' one', 'one ', 'one  two\tthree\n', '\n\none two  '])
+def test_split_whitespace_matches_pattern(text: str) -> None:
+    expected = list(old_split({'text': text}))
+    assert list(ops.Split('text')({'text': text})) == expected
+    assert list(ops.Split('text', separator=None)({'text': text})) == expected